@@ -0,0 +1,117 @@
+"""Measure import time and resident memory of the integration's constants.
+
+Run from the repository root:
+
+    python benchmarks/bench_import.py [--rounds N]
+
+Each scenario runs in a fresh interpreter. ``embedded`` rebuilds the old
+const.py with both templates inlined as string literals, which is what every
+import of DOMAIN or a CONF_* key used to pay for; ``lazy`` imports the
+current const.py the same way. The remaining scenarios import the whole
+package, then load the templates and release them again.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from stubs import ROOT
+
+PACKAGE = "custom_components.frosted_glass_manager"
+PACKAGE_DIR = os.path.join(ROOT, "custom_components", "frosted_glass_manager")
+
+_PROBE = """
+import gc, json, os, sys, time
+sys.path.insert(0, {benchmarks!r})
+sys.path.insert(0, {root!r})
+from stubs import install_homeassistant_stubs
+install_homeassistant_stubs()
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+base = rss_kib()
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+gc.collect()
+print(json.dumps({{"seconds": elapsed, "rss_kib": rss_kib() - base}}))
+"""
+
+SCENARIOS = {
+    "embedded": "import const_embedded",
+    "lazy": "sys.path.insert(0, {package_dir!r})\nimport const",
+    "package": "from {package} import const, renderer",
+    "first_render": (
+        "from {package} import const, renderer\n"
+        "renderer.get_compiled_template(const.THEME_TEMPLATE_FILE)\n"
+        "renderer.get_compiled_template(const.LITE_THEME_TEMPLATE_FILE)"
+    ),
+    "released": (
+        "from {package} import const, renderer\n"
+        "renderer.get_compiled_template(const.THEME_TEMPLATE_FILE)\n"
+        "renderer.get_compiled_template(const.LITE_THEME_TEMPLATE_FILE)\n"
+        "renderer.release_templates()"
+    ),
+}
+
+
+def write_embedded_const(directory):
+    """Recreate the pre-split const.py with the templates as literals."""
+    with open(os.path.join(PACKAGE_DIR, "const.py"), encoding="utf-8") as f:
+        source = f.read()
+    for name, filename in (
+        ("THEME_TEMPLATE", "frosted_glass.yaml"),
+        ("LITE_THEME_TEMPLATE", "frosted_glass_lite.yaml"),
+    ):
+        path = os.path.join(PACKAGE_DIR, "theme_templates", filename)
+        with open(path, encoding="utf-8", newline="") as f:
+            source += f"\n{name} = {f.read()!r}\n"
+    with open(os.path.join(directory, "const_embedded.py"), "w", encoding="utf-8") as f:
+        f.write(source)
+
+
+def run(body, directory):
+    """Run one probe in a fresh interpreter and return its measurements."""
+    code = _PROBE.format(
+        benchmarks=os.path.dirname(os.path.abspath(__file__)),
+        root=ROOT,
+        body=body.format(package=PACKAGE, package_dir=PACKAGE_DIR),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=directory,
+        env={**os.environ, "PYTHONPATH": directory},
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_embedded_const(directory)
+        print(f"{'scenario':<14} {'median ms':>10} {'rss KiB':>9}")
+        for name, body in SCENARIOS.items():
+            # The first run writes the bytecode cache, like a restarted install.
+            run(body, directory)
+            samples = [run(body, directory) for _ in range(args.rounds)]
+            seconds = statistics.median(s["seconds"] for s in samples)
+            rss = statistics.median(s["rss_kib"] for s in samples)
+            print(f"{name:<14} {seconds * 1000:>10.3f} {rss:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare the compiled theme renderer against the legacy chained str.replace path.
+
+Run from the repository root:
+
+    python benchmarks/bench_render.py [--rounds N]
+
+Home Assistant does not need to be installed; the few names the integration
+imports at module level are replaced by stand-ins.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from stubs import ROOT, install_homeassistant_stubs
+
+install_homeassistant_stubs()
+sys.path.insert(0, ROOT)
+
+from custom_components.frosted_glass_manager import generate_hex_palette  # noqa: E402
+from custom_components.frosted_glass_manager import const  # noqa: E402
+from custom_components.frosted_glass_manager.renderer import (  # noqa: E402
+    MODE_DARK,
+    MODE_LIGHT,
+    SCOPE_THEME,
+    compile_template,
+    load_template,
+    mode_values,
+    theme_values,
+)
+
+LIGHT_PRIMARY = "220, 90, 40"
+DARK_PRIMARY = "40, 160, 120"
+LIGHT_BG = "/local/light.jpg"
+DARK_BG = "/local/dark.jpg"
+
+
+def legacy_render(template, light_palette, dark_palette):
+    """The chained str.replace implementation this renderer replaced."""
+    parts = template.split("    dark:")
+    light_part = parts[0]
+    dark_part = "    dark:" + "".join(parts[1:])
+
+    light_part = light_part.replace(const.DEFAULT_LIGHT_RGB, LIGHT_PRIMARY)
+    light_part = light_part.replace(const.DEFAULT_LIGHT_BG_URL, LIGHT_BG)
+    for level, old_hex in const.DEFAULT_PALETTE.items():
+        light_part = light_part.replace(old_hex, light_palette.get(level, old_hex))
+
+    dark_part = dark_part.replace(const.DEFAULT_DARK_RGB, DARK_PRIMARY)
+    dark_part = dark_part.replace(const.DEFAULT_DARK_BG_URL, DARK_BG)
+    for level, old_hex in const.DEFAULT_PALETTE.items():
+        dark_part = dark_part.replace(old_hex, dark_palette.get(level, old_hex))
+
+    return light_part + dark_part
+
+
+def compiled_render(compiled, light_palette, dark_palette):
+    """Render through an already compiled template."""
+    values = {
+        MODE_LIGHT: mode_values(LIGHT_PRIMARY, LIGHT_BG, light_palette),
+        MODE_DARK: mode_values(DARK_PRIMARY, DARK_BG, dark_palette),
+        SCOPE_THEME: theme_values(const.DEFAULT_THEME_NAME),
+    }
+    return compiled.render(values)
+
+
+def measure(func, args, rounds):
+    """Return (mean seconds, peak traced bytes) of ``func(*args)``."""
+    func(*args)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(*args)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    light_palette = generate_hex_palette(LIGHT_PRIMARY)
+    dark_palette = generate_hex_palette(DARK_PRIMARY)
+
+    print(f"{'template':<10} {'path':<9} {'mean ms':>9} {'peak KiB':>9}")
+    for name, template in (
+        ("full", load_template(const.THEME_TEMPLATE_FILE)),
+        ("lite", load_template(const.LITE_THEME_TEMPLATE_FILE)),
+    ):
+        compiled = compile_template(template)
+        for label, func, source in (
+            ("legacy", legacy_render, template),
+            ("compile", lambda source, *_: compile_template(source), template),
+            ("compiled", compiled_render, compiled),
+        ):
+            elapsed, peak = measure(func, (source, light_palette, dark_palette), args.rounds)
+            print(f"{name:<10} {label:<9} {elapsed * 1000:>9.3f} {peak / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Benchmark suite for the Frosted Glass theme generation pipeline.
+
+Run from the repository root:
+
+    python benchmarks/run.py [--rounds N] [--output results.json]
+                             [--compare baseline.json] [--tolerance 0.25]
+
+Every case records its median wall time and the peak memory traced while it
+runs once. Results are written as JSON so runs can be compared; with
+``--compare`` the suite exits non-zero when a case got slower, or allocated
+more, than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from stubs import (
+    ROOT,
+    FakeConfigEntry,
+    FakeHomeAssistant,
+    install_homeassistant_stubs,
+)
+
+install_homeassistant_stubs()
+sys.path.insert(0, ROOT)
+
+import bench_import  # noqa: E402
+from custom_components.frosted_glass_manager import generate_theme_file  # noqa: E402
+from custom_components.frosted_glass_manager import const, palette, renderer  # noqa: E402
+from custom_components.frosted_glass_manager.writer import (  # noqa: E402
+    write_if_changed,
+    write_segments_if_changed,
+)
+
+OPTIONS = {
+    const.CONF_LIGHT_PRIMARY: [220, 90, 40],
+    const.CONF_DARK_PRIMARY: [40, 160, 120],
+    const.CONF_LIGHT_BG: "/local/light.jpg",
+    const.CONF_DARK_BG: "/local/dark.jpg",
+}
+ALT_OPTIONS = {**OPTIONS, const.CONF_LIGHT_PRIMARY: [30, 90, 220]}
+
+
+def measure(func, rounds, setup=None):
+    """Return the median seconds and the peak traced bytes of ``func``."""
+    samples = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": statistics.median(samples), "peak_bytes": peak}
+
+
+def pipeline_cases(workdir):
+    """Yield (name, func, setup) for every stage of the pipeline."""
+    light = "220, 90, 40"
+    yield "palette.cold", lambda: palette.generate_hex_palette(light), (
+        palette._palette_for.cache_clear
+    )
+    yield "palette.cached", lambda: palette.generate_hex_palette(light), None
+    yield "palette.batch_256", lambda: palette.generate_hex_palettes(
+        [(i, 255 - i, (i * 7) % 256) for i in range(256)]
+    ), None
+
+    values = {
+        renderer.MODE_LIGHT: renderer.mode_values(
+            light, "/local/light.jpg", palette.generate_hex_palette(light)
+        ),
+        renderer.MODE_DARK: renderer.mode_values(
+            "40, 160, 120", "/local/dark.jpg", palette.generate_hex_palette("40, 160, 120")
+        ),
+        renderer.SCOPE_THEME: renderer.theme_values(const.DEFAULT_THEME_NAME),
+    }
+    for variant, filename in (
+        ("full", const.THEME_TEMPLATE_FILE),
+        ("lite", const.LITE_THEME_TEMPLATE_FILE),
+    ):
+        template = renderer.load_template(filename)
+        compiled = renderer.compile_template(template)
+        content = compiled.render(values)
+        other = content.replace("220, 90, 40", "30, 90, 220")
+        path = os.path.join(workdir, f"{variant}.yaml")
+        flip = [content, other]
+        segments = compiled.segments(values)
+        flip_segments = [
+            segments, [segment.replace("220, 90, 40", "30, 90, 220") for segment in segments]
+        ]
+
+        def write_changed(path=path, flip=flip):
+            flip.reverse()
+            write_if_changed(path, flip[0])
+
+        def write_streamed(path=path, flip=flip_segments):
+            flip.reverse()
+            write_segments_if_changed(path, flip[0])
+
+        yield f"{variant}.load", lambda filename=filename: renderer.load_template(filename), None
+        yield f"{variant}.split", lambda template=template: renderer.compile_template(template), None
+        yield f"{variant}.substitute", lambda compiled=compiled: compiled.render(values), None
+        yield f"{variant}.write", write_changed, None
+        yield f"{variant}.write_streamed", write_streamed, None
+        yield f"{variant}.write_unchanged", lambda path=path, content=content: (
+            write_if_changed(path, content)
+        ), lambda path=path, content=content: write_if_changed(path, content)
+
+    config_dir = os.path.join(workdir, "config")
+    os.mkdir(config_dir)
+    hass = FakeHomeAssistant(config_dir)
+    entries = [FakeConfigEntry(OPTIONS), FakeConfigEntry(ALT_OPTIONS)]
+
+    def generate_changed():
+        entries.reverse()
+        generate_theme_file(hass, entries[0])
+
+    yield "generate.cold", generate_changed, renderer.release_templates
+    yield "generate.changed", generate_changed, None
+    yield "generate.unchanged", lambda: generate_theme_file(hass, entries[0]), None
+
+    # Incremental renders: only the dark background changes between calls
+    data = {const.DATA_FRAGMENTS: {}}
+    dark_entries = [
+        FakeConfigEntry({**OPTIONS, const.CONF_DARK_BG: "/local/dark-a.jpg"}),
+        FakeConfigEntry({**OPTIONS, const.CONF_DARK_BG: "/local/dark-b.jpg"}),
+    ]
+
+    def generate_dark_changed():
+        dark_entries.reverse()
+        generate_theme_file(hass, dark_entries[0], data=data)
+
+    yield "generate.dark_changed", generate_dark_changed, None
+    yield "generate.fragments_unchanged", lambda: generate_theme_file(
+        hass, dark_entries[0], data=data
+    ), None
+
+
+def run_suite(rounds, import_rounds):
+    """Run every case and return the results document."""
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="frosted-glass-bench-")
+    try:
+        for name, func, setup in pipeline_cases(workdir):
+            results[name] = measure(func, rounds, setup)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        bench_import.write_embedded_const(directory)
+        for name, body in bench_import.SCENARIOS.items():
+            bench_import.run(body, directory)
+            samples = [bench_import.run(body, directory) for _ in range(import_rounds)]
+            results[f"import.{name}"] = {
+                "seconds": statistics.median(s["seconds"] for s in samples),
+                "rss_kib": statistics.median(s["rss_kib"] for s in samples),
+            }
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rounds": rounds,
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Return the regressions of ``current`` against ``baseline``."""
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for metric in ("seconds", "peak_bytes", "rss_kib"):
+            if metric not in result or not previous.get(metric):
+                continue
+            ratio = result[metric] / previous[metric]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} {metric}: {ratio:.2f}x baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--import-rounds", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    current = run_suite(args.rounds, args.import_rounds)
+
+    print(f"{'case':<28} {'median ms':>10} {'peak KiB':>9}")
+    for name, result in current["results"].items():
+        memory = result.get("peak_bytes", result.get("rss_kib", 0) * 1024) / 1024
+        print(f"{name:<28} {result['seconds'] * 1000:>10.3f} {memory:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
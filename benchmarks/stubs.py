@@ -0,0 +1,261 @@
+"""Stand-ins for the parts of Home Assistant the benchmarks and tests need."""
+import asyncio
+import json
+import os
+import sys
+import types
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def async_call_later(hass, delay, action):
+    """Run ``action`` after ``delay`` seconds; return the cancel callable."""
+
+    def run():
+        result = action(datetime.now(timezone.utc))
+        if asyncio.iscoroutine(result):
+            hass.async_create_task(result)
+
+    return asyncio.get_running_loop().call_later(delay, run).cancel
+
+
+class Store:
+    """Stand-in for ``Store`` keeping its data as JSON under ``.storage``."""
+
+    def __init__(self, hass, version, key):
+        self.path = hass.config.path(".storage", key)
+
+    async def async_load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    async def async_save(self, data):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    async def async_remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def async_get_integration(hass, domain):
+    """Return the manifest of the integration as an object."""
+    path = os.path.join(ROOT, "custom_components", domain, "manifest.json")
+    with open(path, encoding="utf-8") as f:
+        return types.SimpleNamespace(**json.load(f))
+
+
+def load_yaml(path):
+    """Load a YAML file like Home Assistant's loader, for plain YAML."""
+    import yaml
+
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+class HomeAssistantError(Exception):
+    """Stand-in for ``HomeAssistantError``."""
+
+
+class ServiceCall:
+    """Stand-in for a ``ServiceCall`` carrying the validated data."""
+
+    def __init__(self, domain, service, data=None, return_response=False):
+        self.domain = domain
+        self.service = service
+        self.data = data or {}
+        self.return_response = return_response
+
+
+def install_homeassistant_stubs():
+    """Register the minimal ``homeassistant`` modules the integration imports."""
+    if "homeassistant" in sys.modules:
+        return
+    core = types.ModuleType("homeassistant.core")
+    core.HomeAssistant = object
+    core.callback = lambda func: func
+    core.ServiceCall = ServiceCall
+    core.SupportsResponse = types.SimpleNamespace(
+        NONE="none", OPTIONAL="optional", ONLY="only"
+    )
+    config_entries = types.ModuleType("homeassistant.config_entries")
+    config_entries.ConfigEntry = object
+    exceptions = types.ModuleType("homeassistant.exceptions")
+    exceptions.HomeAssistantError = HomeAssistantError
+    event = types.ModuleType("homeassistant.helpers.event")
+    event.async_call_later = async_call_later
+    dispatcher = types.ModuleType("homeassistant.helpers.dispatcher")
+    dispatcher.async_dispatcher_send = lambda hass, signal, *args: None
+    storage = types.ModuleType("homeassistant.helpers.storage")
+    storage.Store = Store
+    helpers = types.ModuleType("homeassistant.helpers")
+    helpers.event = event
+    helpers.dispatcher = dispatcher
+    helpers.storage = storage
+    loader = types.ModuleType("homeassistant.loader")
+    loader.async_get_integration = async_get_integration
+    dt = types.ModuleType("homeassistant.util.dt")
+    dt.utcnow = lambda: datetime.now(timezone.utc)
+    util_yaml = types.ModuleType("homeassistant.util.yaml")
+    util_yaml.load_yaml = load_yaml
+    util = types.ModuleType("homeassistant.util")
+    util.dt = dt
+    util.yaml = util_yaml
+    package = types.ModuleType("homeassistant")
+    package.core = core
+    package.config_entries = config_entries
+    package.exceptions = exceptions
+    package.helpers = helpers
+    package.util = util
+    package.loader = loader
+    sys.modules.update(
+        {
+            "homeassistant": package,
+            "homeassistant.core": core,
+            "homeassistant.config_entries": config_entries,
+            "homeassistant.exceptions": exceptions,
+            "homeassistant.helpers": helpers,
+            "homeassistant.helpers.event": event,
+            "homeassistant.helpers.dispatcher": dispatcher,
+            "homeassistant.helpers.storage": storage,
+            "homeassistant.loader": loader,
+            "homeassistant.util": util,
+            "homeassistant.util.dt": dt,
+            "homeassistant.util.yaml": util_yaml,
+        }
+    )
+
+
+class FakeConfig:
+    """Stand-in for ``hass.config`` rooted at a scratch directory."""
+
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+
+    def path(self, *parts):
+        return os.path.join(self.config_dir, *parts)
+
+
+class FakeBus:
+    """Stand-in for ``hass.bus`` recording the events fired."""
+
+    def __init__(self):
+        self.fired = []
+        self._listeners = {}
+
+    def async_listen(self, event_type, listener):
+        listeners = self._listeners.setdefault(event_type, [])
+        listeners.append(listener)
+        return lambda: listeners.remove(listener)
+
+    def async_fire(self, event_type, event_data=None):
+        self.fired.append(event_type)
+        for listener in list(self._listeners.get(event_type, ())):
+            listener(types.SimpleNamespace(event_type=event_type, data=event_data or {}))
+
+
+class FakeServices:
+    """Stand-in for ``hass.services`` recording the calls to other domains."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._services = {}
+        self.calls = []
+
+    def has_service(self, domain, service):
+        return (domain, service) in self._services
+
+    def async_register(self, domain, service, handler, schema=None, supports_response=None):
+        self._services[(domain, service)] = (handler, schema)
+
+    def async_remove(self, domain, service):
+        self._services.pop((domain, service), None)
+
+    async def async_call(
+        self, domain, service, data=None, blocking=False, return_response=False
+    ):
+        if (domain, service) not in self._services:
+            self.calls.append((domain, service))
+            return None
+        handler, schema = self._services[(domain, service)]
+        data = schema(data or {}) if schema is not None else data or {}
+        return await handler(ServiceCall(domain, service, data, return_response))
+
+
+class FakeConfigEntries:
+    """Stand-in for ``hass.config_entries`` holding the entries set up."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self.entries = []
+
+    def async_entries(self, domain=None):
+        return list(self.entries)
+
+    def async_get_entry(self, entry_id):
+        return next((entry for entry in self.entries if entry.entry_id == entry_id), None)
+
+    def async_update_entry(self, entry, options=None):
+        if options is None or dict(options) == dict(entry.options):
+            return False
+        entry.options = options
+        for listener in entry.update_listeners:
+            self._hass.async_create_task(listener(self._hass, entry))
+        return True
+
+    async def async_forward_entry_setups(self, entry, platforms):
+        return None
+
+    async def async_unload_platforms(self, entry, platforms):
+        return True
+
+
+class FakeHomeAssistant:
+    """Stand-in for the ``hass`` object passed to the integration."""
+
+    def __init__(self, config_dir):
+        self.config = FakeConfig(config_dir)
+        self.data = {}
+        self.bus = FakeBus()
+        self.services = FakeServices(self)
+        self.config_entries = FakeConfigEntries(self)
+
+    async def async_add_executor_job(self, target, *args):
+        """Run ``target`` in the default executor of the running loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+    def async_create_task(self, target):
+        """Schedule ``target`` on the running loop."""
+        return asyncio.get_running_loop().create_task(target)
+
+
+class FakeConfigEntry:
+    """Stand-in for a ``ConfigEntry`` with its listeners and unload callbacks."""
+
+    def __init__(self, options=None, entry_id="benchmark", data=None):
+        self.entry_id = entry_id
+        self.title = "Frosted Glass Manager"
+        self.data = data or {}
+        self.options = options or {}
+        self.update_listeners = []
+        self.on_unload = []
+        self.background_tasks = []
+
+    def add_update_listener(self, listener):
+        self.update_listeners.append(listener)
+        return lambda: self.update_listeners.remove(listener)
+
+    def async_on_unload(self, func):
+        self.on_unload.append(func)
+
+    def async_create_background_task(self, hass, target, name):
+        task = asyncio.get_running_loop().create_task(target)
+        self.background_tasks.append(task)
+        return task
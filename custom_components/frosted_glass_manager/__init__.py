@@ -1,10 +1,18 @@
 """The Frosted Glass Theme Manager integration."""
+import hashlib
+import json
 import os
 import logging
-import colorsys
+import shutil
+import time
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.loader import async_get_integration
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -12,62 +20,581 @@ from .const import (
     CONF_LIGHT_BG,
     CONF_DARK_PRIMARY,
     CONF_DARK_BG,
+    CONF_LIGHT_ACCENT,
+    CONF_DARK_ACCENT,
     CONF_RESET,
+    CONF_DEBOUNCE_MS,
+    CONF_MIRROR_BACKGROUNDS,
+    CONF_OPTIMIZE_BACKGROUNDS,
+    CONF_BLUR_LITE_BACKGROUND,
+    CONF_MINIFY_CSS,
+    CONF_YAML_ANCHORS,
+    CONF_IN_MEMORY_THEMES,
+    CONF_EXPORT_THEME_FILES,
+    CONF_THEME_NAME,
+    DEFAULT_THEME_NAME,
+    LITE_THEME_SUFFIX,
+    FILENAME_UNSAFE_CHARS,
+    GENERATED_HEADER,
+    DEFAULT_DEBOUNCE_MS,
     DEFAULT_LIGHT_RGB,
     DEFAULT_DARK_RGB,
     DEFAULT_LIGHT_BG_URL,
     DEFAULT_DARK_BG_URL,
-    DEFAULT_PALETTE,
-    THEME_TEMPLATE,
-    THEME_FILENAME,
-    LITE_THEME_TEMPLATE,
-    LITE_THEME_FILENAME,
+    MIRROR_DIR,
+    THEME_TEMPLATE_FILE,
+    LITE_THEME_TEMPLATE_FILE,
+    DATA_STATS,
+    DATA_CANCEL_DEBOUNCE,
+    DATA_SCHEDULER,
+    DATA_BACKGROUNDS,
+    DATA_MIRROR,
+    DATA_ROOT_CSS,
+    DATA_LITE_CARD_CSS,
+    DATA_FRAGMENTS,
+    DATA_STORE,
+    DATA_INTEGRATION_VERSION,
+    DATA_RENDER_STATE,
+    DATA_HISTORY,
+    DATA_THEMES,
+    STORAGE_VERSION,
+    STORAGE_KEY,
+    HISTORY_DIR,
+    HISTORY_MAX_ITEMS,
+    HISTORY_MAX_BYTES,
+    STAT_RELOADS_PERFORMED,
+    STAT_RELOADS_SKIPPED,
+    STAT_UPDATES_RECEIVED,
+    STAT_UPDATES_COALESCED,
+    STAT_PALETTE_MS,
+    STAT_SUBSTITUTE_MS,
+    STAT_WRITE_MS,
+    STAT_RELOAD_MS,
+    STAT_RENDER_MS,
+    STAT_BYTES_WRITTEN,
+    STAT_WRITES_SKIPPED,
+    STAT_FRAGMENTS_REUSED,
+    STAT_BYTES_SAVED,
+    STAT_LAST_REGENERATION,
+    STAT_STARTUP_RENDER_SKIPPED,
+    STAT_THEMES_REGISTERED,
+    SIGNAL_STATS_UPDATED,
+    FRONTEND_THEMES,
+    EVENT_THEMES_UPDATED,
+    PLATFORMS,
 )
+from .history import ThemeHistory
+from .minify import minify_css
+from .palette import generate_hex_palette
+from .renderer import (
+    MODE_LIGHT,
+    MODE_DARK,
+    SCOPE_THEME,
+    TemplateError,
+    card_backdrop_filters,
+    card_glass_tints,
+    get_compiled_template,
+    get_compiled_theme,
+    get_template_index,
+    load_template,
+    mode_values,
+    release_templates,
+    render_incremental,
+    render_values,
+    template_signature,
+    theme_values,
+)
+from .scheduler import RenderScheduler
+from .writer import is_current as is_file_current, known_digest, write_segments_if_changed
 
 _LOGGER = logging.getLogger(__name__)
 
+def entry_theme_name(entry: ConfigEntry):
+    """Return the theme name of a config entry."""
+    return entry.data.get(CONF_THEME_NAME, DEFAULT_THEME_NAME)
+
+def theme_names(name):
+    """Return the names of the Full and Lite themes called ``name``."""
+    return name, name + LITE_THEME_SUFFIX
+
+def theme_filename(name):
+    """Return the file name in ``themes/`` of the theme called ``name``."""
+    for char in FILENAME_UNSAFE_CHARS:
+        name = name.replace(char, "_")
+    return f"{name}.yaml"
+
+def theme_filenames(name):
+    """Return the file names of the Full and Lite themes called ``name``."""
+    return tuple(theme_filename(theme) for theme in theme_names(name))
+
+def is_foreign_theme_file(hass: HomeAssistant, filename):
+    """Return True if ``themes/<filename>`` exists and was not written by us (blocking)."""
+    header = GENERATED_HEADER.encode("utf-8")
+    try:
+        with open(hass.config.path("themes", filename), "rb") as f:
+            return f.read(len(header)) != header
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True
+
+def _mirror_dir(hass: HomeAssistant, entry: ConfigEntry, *parts):
+    """Return the path of the local background directory of a config entry."""
+    return hass.config.path("www", MIRROR_DIR, entry.entry_id, *parts)
+
+def _history_dir(hass: HomeAssistant, entry: ConfigEntry):
+    """Return the path of the theme history directory of a config entry."""
+    return hass.config.path(".storage", HISTORY_DIR, entry.entry_id)
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Frosted Glass Theme Manager from a config entry."""
+    stats = {
+        STAT_RELOADS_PERFORMED: 0,
+        STAT_RELOADS_SKIPPED: 0,
+        STAT_UPDATES_RECEIVED: 0,
+        STAT_UPDATES_COALESCED: 0,
+        STAT_PALETTE_MS: None,
+        STAT_SUBSTITUTE_MS: None,
+        STAT_WRITE_MS: None,
+        STAT_RELOAD_MS: None,
+        STAT_RENDER_MS: None,
+        STAT_BYTES_WRITTEN: {},
+        STAT_WRITES_SKIPPED: 0,
+        STAT_FRAGMENTS_REUSED: 0,
+        STAT_BYTES_SAVED: {},
+        STAT_LAST_REGENERATION: None,
+        STAT_STARTUP_RENDER_SKIPPED: False,
+        STAT_THEMES_REGISTERED: 0,
+    }
+    data = {
+        DATA_STATS: stats,
+        DATA_CANCEL_DEBOUNCE: None,
+        DATA_BACKGROUNDS: {},
+        DATA_MIRROR: None,
+        DATA_ROOT_CSS: {},
+        DATA_LITE_CARD_CSS: {},
+        DATA_FRAGMENTS: {},
+        DATA_STORE: Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry.entry_id)),
+        DATA_INTEGRATION_VERSION: str((await async_get_integration(hass, DOMAIN)).version),
+        DATA_HISTORY: ThemeHistory(
+            _history_dir(hass, entry), HISTORY_MAX_ITEMS, HISTORY_MAX_BYTES
+        ),
+        DATA_THEMES: {},
+    }
+    data[DATA_RENDER_STATE] = await data[DATA_STORE].async_load()
+
+    def render(is_current):
+        return _render_entry(hass, entry, data, is_current)
+
+    data[DATA_SCHEDULER] = RenderScheduler(hass, render)
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = data
     entry.async_on_unload(entry.add_update_listener(update_listener))
-    await hass.async_add_executor_job(generate_theme_file, hass, entry)
+
+    @callback
+    def _async_themes_updated(_event):
+        # A reload of the theme files replaces the whole registry
+        if entry.entry_id in hass.data.get(DOMAIN, {}) and entry.options.get(
+            CONF_IN_MEMORY_THEMES, False
+        ):
+            _async_register_themes(hass, entry)
+
+    entry.async_on_unload(hass.bus.async_listen(EVENT_THEMES_UPDATED, _async_themes_updated))
+    # Start from the backgrounds mirrored before; fetching can wait.
+    await _async_update_backgrounds(hass, entry, revalidate=False)
+    if await _async_render_if_needed(hass, entry) is None:
+        stats[STAT_STARTUP_RENDER_SKIPPED] = True
+    if entry.options.get(CONF_IN_MEMORY_THEMES, False):
+        _async_register_themes(hass, entry)
+    if entry.options.get(CONF_MIRROR_BACKGROUNDS, False):
+        entry.async_create_background_task(
+            hass,
+            _async_revalidate_backgrounds(hass, entry),
+            f"{DOMAIN} background revalidation",
+        )
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Services pull in voluptuous and the YAML loader; import them lazily.
+    from .services import async_setup_services
+
+    async_setup_services(hass)
+    return True
+
+@callback
+def _cancel_debounce(hass: HomeAssistant, entry: ConfigEntry):
+    """Cancel a pending debounced regeneration, if any."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    cancel = data[DATA_CANCEL_DEBOUNCE]
+    data[DATA_CANCEL_DEBOUNCE] = None
+    if cancel is None:
+        return False
+    cancel()
     return True
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
-    """Handle options update."""
-    await hass.async_add_executor_job(generate_theme_file, hass, entry)
-    await hass.services.async_call("frontend", "reload_themes", {})
+    """Handle options update.
+
+    Updates are debounced: every update restarts the window, and the render
+    runs once the options have been quiet for the configured delay. The
+    render reads entry.options when it starts, so the last update wins.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    stats = data[DATA_STATS]
+    stats[STAT_UPDATES_RECEIVED] += 1
+    if _cancel_debounce(hass, entry):
+        stats[STAT_UPDATES_COALESCED] += 1
+
+    delay = entry.options.get(CONF_DEBOUNCE_MS, DEFAULT_DEBOUNCE_MS) / 1000
+
+    async def _regenerate(_now):
+        data[DATA_CANCEL_DEBOUNCE] = None
+        await _async_regenerate(hass, entry)
 
-def generate_hex_palette(rgb_str):
+    data[DATA_CANCEL_DEBOUNCE] = async_call_later(hass, delay, _regenerate)
+
+async def _async_regenerate(hass: HomeAssistant, entry: ConfigEntry):
+    """Refresh the backgrounds, then regenerate the themes."""
+    await _async_update_backgrounds(hass, entry)
+    await _async_render_and_reload(hass, entry)
+
+async def _async_revalidate_backgrounds(hass: HomeAssistant, entry: ConfigEntry):
+    """Revalidate the mirrored backgrounds and regenerate the themes if they changed."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    keys = (DATA_BACKGROUNDS, DATA_ROOT_CSS, DATA_LITE_CARD_CSS)
+    before = [data[key] for key in keys]
+    await _async_update_backgrounds(hass, entry)
+    if [data[key] for key in keys] == before:
+        _LOGGER.debug(f"Frosted Glass backgrounds of {entry.title} are unchanged")
+        return
+    await _async_render_and_reload(hass, entry)
+
+async def _async_render_and_reload(hass: HomeAssistant, entry: ConfigEntry):
+    """Regenerate the themes and reload or re-register them if anything changed."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    changed = await _async_render_if_needed(hass, entry) or []
+    stats = data[DATA_STATS]
+    if entry.options.get(CONF_IN_MEMORY_THEMES, False):
+        stats[STAT_RELOADS_SKIPPED] += 1
+        start = time.perf_counter()
+        if _async_register_themes(hass, entry):
+            stats[STAT_RELOAD_MS] = _elapsed_ms(start)
+    elif not changed:
+        stats[STAT_RELOADS_SKIPPED] += 1
+        _LOGGER.debug("Frosted Glass themes unchanged, skipping frontend.reload_themes")
+    else:
+        stats[STAT_RELOADS_PERFORMED] += 1
+        start = time.perf_counter()
+        await hass.services.async_call("frontend", "reload_themes", {}, blocking=True)
+        stats[STAT_RELOAD_MS] = _elapsed_ms(start)
+
+    async_dispatcher_send(hass, SIGNAL_STATS_UPDATED.format(entry.entry_id))
+
+async def _async_render_if_needed(hass: HomeAssistant, entry: ConfigEntry):
+    """Render the theme files of an entry unless they are already up to date.
+
+    The files on disk are only verified when nothing they depend on changed
+    since they were written, such as on most starts or after a rollback.
+    Returns the names of the files changed, or None if nothing was rendered.
     """
-    Generate a tonal palette (HEX strings) based on a single RGB string.
+    data = hass.data[DOMAIN][entry.entry_id]
+    fingerprint = await hass.async_add_executor_job(
+        _render_fingerprint, entry, data, dict(entry.options)
+    )
+    saved = data[DATA_RENDER_STATE]
+    # In-memory themes exist only once rendered, so they always are.
+    if (
+        not entry.options.get(CONF_IN_MEMORY_THEMES, False)
+        and saved is not None
+        and saved.get("fingerprint") == fingerprint
+        and await hass.async_add_executor_job(_theme_files_match, hass, saved["files"])
+    ):
+        _LOGGER.debug(f"Frosted Glass themes of {entry.title} are up to date, not regenerated")
+        return None
+
+    changed, (data[DATA_THEMES], fingerprint, files) = await data[DATA_SCHEDULER].async_render()
+    data[DATA_STATS][STAT_LAST_REGENERATION] = dt_util.utcnow()
+    await _async_save_render_state(hass, entry, fingerprint, files)
+    return changed
+
+def _render_entry(hass: HomeAssistant, entry: ConfigEntry, data, is_current=None):
+    """Render the themes of an entry from one snapshot of its options and inputs.
+
+    The fingerprint is taken from the same snapshot and the history is
+    updated here, inside the scheduler, so both always describe the files
+    this render wrote even if the options change meanwhile. Returns the
+    changed files and (themes, fingerprint, digests of the files or None).
     """
-    try:
-        parts = [int(x) for x in rgb_str.split(",")]
-        r, g, b = parts[0], parts[1], parts[2]
-    except (ValueError, IndexError):
-        r, g, b = 106, 116, 211
+    options = dict(entry.options)
+    inputs = dict(data)
+    fingerprint = _render_fingerprint(entry, inputs, options)
+    changed, themes = generate_theme_file(hass, entry, is_current, inputs, options)
 
-    h, l, s = colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0)
+    files = {}
+    for template_file, filename in zip(
+        (THEME_TEMPLATE_FILE, LITE_THEME_TEMPLATE_FILE),
+        theme_filenames(entry_theme_name(entry)),
+    ):
+        path = hass.config.path("themes", filename)
+        written = data[DATA_FRAGMENTS].get(template_file, {}).get("written")
+        if written is None or written[0] != path:
+            # A file could not be written; make sure the next start regenerates.
+            return changed, (themes, fingerprint, None)
+        files[filename] = written[1]
 
-    lightness_levels = {
-        "05": 0.05, "10": 0.10, "20": 0.20, "30": 0.30, "40": 0.40,
-        "50": l, "60": 0.60, "70": 0.70, "80": 0.80, "90": 0.90, "95": 0.96,
+    if is_current is None or is_current():
+        try:
+            data[DATA_HISTORY].record(
+                fingerprint,
+                {filename: hass.config.path("themes", filename) for filename in files},
+                options,
+                resolve_theme_inputs(options) == resolve_theme_inputs({})
+                and resolve_accent_colors(options) == (None, None),
+            )
+        except OSError as e:
+            _LOGGER.warning(f"Frosted Glass Manager: could not update the theme history: {e}")
+    return changed, (themes, fingerprint, files)
+
+@callback
+def _async_register_themes(hass: HomeAssistant, entry: ConfigEntry):
+    """Put the in-memory themes of an entry into the frontend's registry.
+
+    Only themes that differ from the registered ones are replaced, and
+    clients are told to fetch the themes again only if any was. Returns
+    True if the registry changed.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    registry = hass.data.get(FRONTEND_THEMES)
+    if registry is None:
+        _LOGGER.warning(
+            "Frosted Glass Manager: the frontend theme registry is not available, "
+            "in-memory themes are not registered"
+        )
+        return False
+    changed = False
+    for name, theme in data[DATA_THEMES].items():
+        if registry.get(name) != theme:
+            changed = True
+        # Every render builds new dicts; keep ours registered for unloading
+        registry[name] = theme
+    if changed:
+        data[DATA_STATS][STAT_THEMES_REGISTERED] += 1
+        hass.bus.async_fire(EVENT_THEMES_UPDATED)
+    return changed
+
+@callback
+def _async_unregister_themes(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove the in-memory themes of an entry from the frontend's registry."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    registry = hass.data.get(FRONTEND_THEMES) or {}
+    removed = [
+        name for name, theme in data[DATA_THEMES].items() if registry.get(name) is theme
+    ]
+    for name in removed:
+        del registry[name]
+    if removed:
+        hass.bus.async_fire(EVENT_THEMES_UPDATED)
+
+def _render_fingerprint(entry: ConfigEntry, data, options):
+    """Return a digest of everything the theme files of an entry depend on.
+
+    That is the ``options``, the theme name, the integration version, the
+    template files (by size and mtime) and the background-derived inputs.
+    """
+    inputs = {
+        "options": options,
+        "theme_name": entry_theme_name(entry),
+        "version": data[DATA_INTEGRATION_VERSION],
+        "templates": [
+            template_signature(filename)
+            for filename in (THEME_TEMPLATE_FILE, LITE_THEME_TEMPLATE_FILE)
+        ],
+        "backgrounds": data[DATA_BACKGROUNDS],
+        "root_css": data[DATA_ROOT_CSS],
+        "lite_card_css": data[DATA_LITE_CARD_CSS],
     }
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def _theme_files_match(hass: HomeAssistant, files):
+    """Return True if every theme file on disk still has its recorded digest."""
+    return all(
+        digest is not None and is_file_current(hass.config.path("themes", filename), digest)
+        for filename, digest in files.items()
+    )
 
-    palette = {}
-    for level, target_l in lightness_levels.items():
-        new_r, new_g, new_b = colorsys.hls_to_rgb(h, target_l, s)
-        new_r = max(0, min(255, int(new_r * 255)))
-        new_g = max(0, min(255, int(new_g * 255)))
-        new_b = max(0, min(255, int(new_b * 255)))
-        palette[level] = f"#{new_r:02X}{new_g:02X}{new_b:02X}"
+async def _async_save_render_state(hass: HomeAssistant, entry: ConfigEntry, fingerprint, files):
+    """Record the fingerprint and file digests the theme files were rendered with.
 
-    return palette
+    With no ``files``, as when a file could not be written, the record is
+    removed so the next start regenerates.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    if files is None:
+        data[DATA_RENDER_STATE] = None
+        await data[DATA_STORE].async_remove()
+        return
+    state = data[DATA_RENDER_STATE] = {"fingerprint": fingerprint, "files": files}
+    await data[DATA_STORE].async_save(state)
 
-def generate_theme_file(hass: HomeAssistant, entry: ConfigEntry):
-    """Generate both theme YAML files based on options."""
-    options = entry.options
+async def async_rollback(hass: HomeAssistant, entry: ConfigEntry, steps=1, defaults=False):
+    """Restore an earlier theme set of an entry from its history.
 
+    The set ``steps`` renders back is restored, or with ``defaults`` the
+    pinned render of the default colors and backgrounds. Its files are
+    swapped in without rendering, and the entry's options are set back to
+    those it was rendered from. Returns the restored history item, or None
+    if the history holds no such set.
+
+    With ``defaults`` and no pinned render yet, as on installs older than
+    the history, the default colors and backgrounds are applied to the
+    options instead and rendered as usual, which pins that render. The
+    returned item then has no ``created`` time.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    current = (data[DATA_RENDER_STATE] or {}).get("fingerprint")
+    items = await hass.async_add_executor_job(data[DATA_HISTORY].items)
+    if defaults and not any(item["pinned"] for item in items):
+        options = reset_options(entry.options)
+        hass.config_entries.async_update_entry(entry, options=options)
+        _LOGGER.info(
+            f"Frosted Glass Manager: no default themes of {entry.title} recorded, "
+            "resetting its colors and backgrounds instead"
+        )
+        return {"created": None, "options": options}
+    items = [item for item in items if item["fingerprint"] != current]
+    if defaults:
+        items = [item for item in items if item["pinned"]]
+        steps = 1
+    if not 1 <= steps <= len(items):
+        return None
+    item = items[steps - 1]
+
+    _cancel_debounce(hass, entry)
+    # A render in flight would overwrite the restored files; wait for it.
+    files = await data[DATA_SCHEDULER].async_run_exclusive(
+        data[DATA_HISTORY].restore, item["fingerprint"], hass.config.path("themes")
+    )
+    # The restored files match the restored options, so the update below
+    # finds them up to date instead of rendering them again.
+    state = data[DATA_RENDER_STATE] = {"fingerprint": item["fingerprint"], "files": files}
+    await data[DATA_STORE].async_save(state)
+    hass.config_entries.async_update_entry(entry, options=item["options"])
+    # In-memory themes are rendered and registered again by the update.
+    if not item["options"].get(CONF_IN_MEMORY_THEMES, False):
+        await hass.services.async_call("frontend", "reload_themes", {}, blocking=True)
+    _LOGGER.info(
+        f"Frosted Glass Manager: restored the themes of {entry.title} from {item['created']}"
+    )
+    return item
+
+async def _async_update_backgrounds(hass: HomeAssistant, entry: ConfigEntry, revalidate=True):
+    """Refresh the local mirror of the configured backgrounds, if enabled.
+
+    Without ``revalidate`` nothing is fetched and only the images mirrored
+    before are used.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    if not entry.options.get(CONF_MIRROR_BACKGROUNDS, False):
+        data[DATA_BACKGROUNDS] = {}
+        data[DATA_ROOT_CSS] = {}
+        data[DATA_LITE_CARD_CSS] = {}
+        return
+
+    if data[DATA_MIRROR] is None:
+        # Only pull in aiohttp and the mirror when the feature is used.
+        from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+        from .mirror import BackgroundMirror
+
+        data[DATA_MIRROR] = BackgroundMirror(
+            hass,
+            async_get_clientsession(hass),
+            _mirror_dir(hass, entry),
+            f"/local/{MIRROR_DIR}/{entry.entry_id}",
+        )
+    _, light_bg, _, dark_bg = resolve_theme_inputs(entry.options)
+    if revalidate:
+        resolve = data[DATA_MIRROR].async_resolve
+    else:
+        resolve = data[DATA_MIRROR].async_resolve_cached
+    data[DATA_BACKGROUNDS] = await resolve([light_bg, dark_bg])
+
+    optimize = entry.options.get(CONF_OPTIMIZE_BACKGROUNDS, False)
+    blur_lite = entry.options.get(CONF_BLUR_LITE_BACKGROUND, False)
+    if optimize or blur_lite:
+        data[DATA_ROOT_CSS], data[DATA_LITE_CARD_CSS] = await hass.async_add_executor_job(
+            _build_background_css,
+            hass,
+            entry,
+            data[DATA_MIRROR],
+            {MODE_LIGHT: light_bg, MODE_DARK: dark_bg},
+            optimize,
+            blur_lite,
+        )
+    else:
+        data[DATA_ROOT_CSS] = {}
+        data[DATA_LITE_CARD_CSS] = {}
+
+def _build_background_css(
+    hass: HomeAssistant, entry: ConfigEntry, mirror, backgrounds, optimize, blur_lite
+):
+    """Process the mirrored backgrounds and build the CSS using the results.
+
+    Returns the ``card-mod-root`` CSS selecting optimized renditions, if
+    ``optimize``, and the Lite ``card-mod-card`` CSS showing a pre-blurred
+    background, if ``blur_lite``; both map a mode to its CSS.
+    """
+    from .optimizer import (
+        RENDITIONS_DIR,
+        blurred_card_css,
+        build_blurred,
+        build_renditions,
+        evict_renditions,
+        load_pillow,
+        rendition_css,
+    )
+
+    if load_pillow() is None:
+        _LOGGER.warning(
+            "Frosted Glass Manager: Pillow is not installed, backgrounds are not processed"
+        )
+        return {}, {}
+
+    filters = {}
+    tints = {}
+    if blur_lite:
+        template = load_template(THEME_TEMPLATE_FILE)
+        index = get_template_index(THEME_TEMPLATE_FILE, template)
+        filters = card_backdrop_filters(template, index)
+        tints = card_glass_tints(template, index)
+    cache_dir = _mirror_dir(hass, entry, RENDITIONS_DIR)
+    url_prefix = f"/local/{MIRROR_DIR}/{entry.entry_id}/{RENDITIONS_DIR}"
+    root_css = {}
+    card_css = {}
+    keep = set()
+    for mode, url in backgrounds.items():
+        path = mirror.local_path(url)
+        if path is None:
+            continue
+        try:
+            if optimize:
+                key, index = build_renditions(path, cache_dir)
+                keep.add(key)
+                root_css[mode] = rendition_css(url_prefix, index)
+            if mode in filters:
+                key, filename = build_blurred(path, cache_dir, *filters[mode])
+                keep.add(key)
+                card_css[mode] = blurred_card_css(f"{url_prefix}/{filename}", tints.get(mode))
+        except Exception as e:
+            _LOGGER.warning(f"Frosted Glass Manager: could not process background {url}: {e}")
+    evict_renditions(cache_dir, keep)
+    return root_css, card_css
+
+def _elapsed_ms(start):
+    """Return the milliseconds elapsed since ``start`` (a perf_counter value)."""
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def resolve_theme_inputs(options):
+    """Return the light primary, light background, dark primary and dark background."""
     # Defaults
     def_light_rgb = DEFAULT_LIGHT_RGB
     def_dark_rgb = DEFAULT_DARK_RGB
@@ -90,71 +617,238 @@ def generate_theme_file(hass: HomeAssistant, entry: ConfigEntry):
         new_dark_primary = get_rgb_string(CONF_DARK_PRIMARY, def_dark_rgb)
         new_dark_bg = options.get(CONF_DARK_BG, DEFAULT_DARK_BG_URL)
 
-    # Generate Hex Palettes
-    light_palette = generate_hex_palette(new_light_primary)
-    dark_palette = generate_hex_palette(new_dark_primary)
+    return new_light_primary, new_light_bg, new_dark_primary, new_dark_bg
+
+def reset_options(options):
+    """Return ``options`` with the colors and backgrounds set back to the defaults."""
+    options = dict(options)
+    options[CONF_LIGHT_PRIMARY] = [int(x) for x in DEFAULT_LIGHT_RGB.split(", ")]
+    options[CONF_LIGHT_BG] = DEFAULT_LIGHT_BG_URL
+    options[CONF_DARK_PRIMARY] = [int(x) for x in DEFAULT_DARK_RGB.split(", ")]
+    options[CONF_DARK_BG] = DEFAULT_DARK_BG_URL
+    options.pop(CONF_LIGHT_ACCENT, None)
+    options.pop(CONF_DARK_ACCENT, None)
+    options[CONF_RESET] = False
+    return options
+
+def resolve_accent_colors(options):
+    """Return the light and dark accent colors; None follows the primary color."""
+    if options.get(CONF_RESET, False):
+        return None, None
+    accents = []
+    for conf_key in (CONF_LIGHT_ACCENT, CONF_DARK_ACCENT):
+        val = options.get(conf_key)
+        if isinstance(val, (list, tuple)):
+            val = f"{val[0]}, {val[1]}, {val[2]}"
+        accents.append(val or None)
+    return tuple(accents)
+
+def _minify_css_by_mode(css_by_mode):
+    """Minify the CSS of each mode; return the result and the bytes saved."""
+    minified = {mode: minify_css(css) for mode, css in css_by_mode.items()}
+    saved = sum(len(css.encode("utf-8")) for css in css_by_mode.values()) - sum(
+        len(css.encode("utf-8")) for css in minified.values()
+    )
+    return minified, saved
+
+def generate_theme_file(
+    hass: HomeAssistant, entry: ConfigEntry, is_current=None, data=None, options=None
+):
+    """Render both themes of an entry; return the changed files and in-memory themes."""
+    if options is None:
+        options = entry.options
+    minify = options.get(CONF_MINIFY_CSS, False)
+    anchors = options.get(CONF_YAML_ANCHORS, False)
+    in_memory = options.get(CONF_IN_MEMORY_THEMES, False)
+    export = not in_memory or options.get(CONF_EXPORT_THEME_FILES, False)
+    # The entry's runtime data: stats, mirrored backgrounds, their CSS and
+    # the fragments kept between renders, all optional
+    if data is None:
+        data = {}
+    stats = data.get(DATA_STATS)
+    backgrounds = data.get(DATA_BACKGROUNDS)
+    root_css = data.get(DATA_ROOT_CSS) or {}
+    lite_card_css = data.get(DATA_LITE_CARD_CSS) or {}
+    fragments = data.get(DATA_FRAGMENTS, {})
+    themes = {}
+    render_start = time.perf_counter()
+    timings = {STAT_PALETTE_MS: 0.0, STAT_SUBSTITUTE_MS: 0.0, STAT_WRITE_MS: 0.0}
+    bytes_written = {}
+    bytes_saved = {}
+    writes_skipped = 0
+    fragments_reused = 0
+
+    new_light_primary, new_light_bg, new_dark_primary, new_dark_bg = resolve_theme_inputs(options)
+    if backgrounds:
+        new_light_bg = backgrounds.get(new_light_bg, new_light_bg)
+        new_dark_bg = backgrounds.get(new_dark_bg, new_dark_bg)
+
+    root_saved = card_saved = 0
+    if minify:
+        root_css, root_saved = _minify_css_by_mode(root_css)
+        lite_card_css, card_saved = _minify_css_by_mode(lite_card_css)
+    modes = {
+        MODE_LIGHT: (new_light_primary, new_light_bg),
+        MODE_DARK: (new_dark_primary, new_dark_bg),
+    }
+    accents = dict(zip((MODE_LIGHT, MODE_DARK), resolve_accent_colors(options)))
+    palettes = {}
+
+    def mode_inputs(mode):
+        """Return the (primary, background, palette) of a mode."""
+        if mode not in palettes:
+            start = time.perf_counter()
+            palettes[mode] = generate_hex_palette(modes[mode][0])
+            timings[STAT_PALETTE_MS] += _elapsed_ms(start)
+        return (*modes[mode], palettes[mode])
+
+    name, lite_name = theme_names(entry_theme_name(entry))
+    filename, lite_filename = theme_filenames(entry_theme_name(entry))
 
     # -------------------------------------------------------------------------
     # HELPER FUNCTION TO PROCESS A SINGLE THEME
     # -------------------------------------------------------------------------
-    def create_theme_file(content_template, output_filename):
-        content = content_template
-        
-        split_marker = "    dark:"
-        if split_marker not in content:
-            _LOGGER.error(f"Frosted Glass Manager: CRITICAL ERROR - Split marker '{split_marker}' not found in {output_filename}.")
-            return
-
-        parts = content.split(split_marker)
-        if len(parts) < 2:
-            _LOGGER.error(f"Frosted Glass Manager: Parsing failed for {output_filename}.")
-            return
-
-        light_part = parts[0]
-        dark_part = split_marker + "".join(parts[1:])
-
-        # --- REPLACE LIGHT ---
-        light_part = light_part.replace(def_light_rgb, new_light_primary)
-        light_part = light_part.replace(DEFAULT_LIGHT_BG_URL, new_light_bg)
-        for level, old_hex in DEFAULT_PALETTE.items():
-            new_hex = light_palette.get(level, old_hex)
-            light_part = light_part.replace(old_hex, new_hex)
-
-        # --- REPLACE DARK ---
-        dark_part = dark_part.replace(def_dark_rgb, new_dark_primary)
-        dark_part = dark_part.replace(DEFAULT_DARK_BG_URL, new_dark_bg)
-        for level, old_hex in DEFAULT_PALETTE.items():
-            new_hex = dark_palette.get(level, old_hex)
-            dark_part = dark_part.replace(old_hex, new_hex)
-
-        final_content = light_part + dark_part
+    def create_theme_file(template_file, output_filename, theme_name, card_css, generated_saved):
+        nonlocal writes_skipped, fragments_reused
+        start = time.perf_counter()
+        try:
+            if in_memory:
+                inputs = {mode: mode_inputs(mode) for mode in modes}
+                themes[theme_name] = get_compiled_theme(template_file, minify).render(
+                    render_values(theme_name, inputs, root_css, card_css, accents)
+                )
+            if export:
+                compiled = get_compiled_template(template_file, minify, anchors)
+        except (OSError, TemplateError) as e:
+            _LOGGER.error(f"Frosted Glass Manager: CRITICAL ERROR - {e} in {output_filename}.")
+            return False
+        if not export:
+            timings[STAT_SUBSTITUTE_MS] += _elapsed_ms(start)
+            return False
+
+        fingerprints = {SCOPE_THEME: theme_name}
+        for mode, (primary, background) in modes.items():
+            fingerprints[mode] = (
+                primary,
+                background,
+                root_css.get(mode, ""),
+                card_css.get(mode, ""),
+                accents[mode],
+            )
+
+        def build_values(scope):
+            if scope == SCOPE_THEME:
+                return theme_values(theme_name)
+            return mode_values(
+                *mode_inputs(scope),
+                root_css.get(scope, ""),
+                card_css.get(scope, ""),
+                accents[scope],
+            )
+
+        file_fragments = fragments.setdefault(template_file, {})
+        segments, rendered = render_incremental(
+            compiled, fingerprints, build_values, file_fragments
+        )
+        fragments_reused += len(compiled.scopes) - len(rendered)
+        if rendered:
+            file_fragments.pop("written", None)
+        bytes_saved[output_filename] = compiled.bytes_saved + generated_saved
+        timings[STAT_SUBSTITUTE_MS] += _elapsed_ms(start)
+
+        if is_current is not None and not is_current():
+            _LOGGER.debug(f"Frosted Glass render of {output_filename} superseded, not written")
+            return False
 
         # Write file
+        start = time.perf_counter()
         try:
             themes_dir = hass.config.path("themes")
             if not os.path.isdir(themes_dir):
                 os.mkdir(themes_dir)
 
             file_path = os.path.join(themes_dir, output_filename)
-            
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(final_content)
-                
+
+            # Nothing was rendered again: the file is up to date as long as
+            # it still holds what was last written, which is cheap to check.
+            written_path, written_digest = file_fragments.get("written", (None, None))
+            if written_path == file_path and is_file_current(file_path, written_digest):
+                written = False
+            else:
+                written = write_segments_if_changed(file_path, [GENERATED_HEADER, *segments])
+                file_fragments["written"] = (file_path, known_digest(file_path))
+            timings[STAT_WRITE_MS] += _elapsed_ms(start)
+            if not written:
+                writes_skipped += 1
+                _LOGGER.debug(f"Frosted Glass theme at {file_path} is up to date, not rewritten")
+                return False
+
+            bytes_written[output_filename] = os.path.getsize(file_path)
             _LOGGER.info(f"Frosted Glass theme successfully generated at {file_path}")
-            
+            return True
+
         except Exception as e:
             _LOGGER.error(f"Frosted Glass Manager: Error writing theme file {output_filename}: {e}")
+            return False
 
     # -------------------------------------------------------------------------
     # EXECUTE GENERATION FOR BOTH THEMES
     # -------------------------------------------------------------------------
-    
+    changed = []
+
     # 1. Generate Main Theme
-    create_theme_file(THEME_TEMPLATE, THEME_FILENAME)
-    
+    if create_theme_file(THEME_TEMPLATE_FILE, filename, name, {}, root_saved):
+        changed.append(filename)
+
     # 2. Generate Lite Theme
-    create_theme_file(LITE_THEME_TEMPLATE, LITE_THEME_FILENAME)
+    if create_theme_file(
+        LITE_THEME_TEMPLATE_FILE, lite_filename, lite_name, lite_card_css, root_saved + card_saved
+    ):
+        changed.append(lite_filename)
+
+    if stats is not None:
+        stats.update({key: round(value, 3) for key, value in timings.items()})
+        stats[STAT_RENDER_MS] = _elapsed_ms(render_start)
+        stats[STAT_BYTES_WRITTEN].update(bytes_written)
+        stats[STAT_WRITES_SKIPPED] += writes_skipped
+        stats[STAT_FRAGMENTS_REUSED] += fragments_reused
+        stats[STAT_BYTES_SAVED].update(bytes_saved)
+
+    return changed, themes
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+    if entry.entry_id in hass.data.get(DOMAIN, {}):
+        _cancel_debounce(hass, entry)
+        _async_unregister_themes(hass, entry)
+    hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+    if not hass.data.get(DOMAIN):
+        from .services import async_unload_services
+
+        async_unload_services(hass)
+        release_templates()
     return True
+
+def _remove_entry_files(hass: HomeAssistant, entry: ConfigEntry):
+    """Delete the theme files and local backgrounds of a config entry."""
+    for filename in theme_filenames(entry_theme_name(entry)):
+        path = hass.config.path("themes", filename)
+        if is_foreign_theme_file(hass, filename):
+            _LOGGER.info(f"Frosted Glass Manager: {path} was not written by this integration, kept")
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            _LOGGER.warning(f"Frosted Glass Manager: could not remove {path}: {e}")
+    shutil.rmtree(_mirror_dir(hass, entry), ignore_errors=True)
+    shutil.rmtree(_history_dir(hass, entry), ignore_errors=True)
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove the generated themes of a deleted config entry."""
+    await hass.async_add_executor_job(_remove_entry_files, hass, entry)
+    await Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry.entry_id)).async_remove()
+    await hass.services.async_call("frontend", "reload_themes", {}, blocking=True)
@@ -0,0 +1,99 @@
+"""Serialized size analysis of the generated theme files."""
+import json
+
+VARIANT_FULL = "full"
+VARIANT_LITE = "lite"
+
+# Variables defined outside ``modes`` apply to every mode.
+SHARED_MODE = "shared"
+
+
+def _json_size(value):
+    """Return the size of ``value`` serialized as compact JSON, in bytes."""
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def variable_sizes(theme):
+    """Return ``{mode: {variable: bytes}}`` for one loaded theme.
+
+    The size of a variable is the size of its ``"key":value`` pair in the
+    JSON the frontend receives.
+    """
+    sizes = {}
+    for key, value in theme.items():
+        if key == "modes" and isinstance(value, dict):
+            for mode, variables in value.items():
+                sizes[mode] = {
+                    name: _json_size(name) + 1 + _json_size(var)
+                    for name, var in (variables or {}).items()
+                }
+        else:
+            sizes.setdefault(SHARED_MODE, {})[key] = _json_size(key) + 1 + _json_size(value)
+    return sizes
+
+
+def analyze_themes(themes, variant, top=10):
+    """Report the serialized size of every theme in one loaded theme file.
+
+    ``themes`` maps theme names to theme dicts, as loaded from the file.
+    Returns ``(reports, sizes)``: one report per theme with the total size,
+    the size per mode, the light/dark difference and the ``top`` largest
+    variables, and the ``variable_sizes`` of every theme.
+    """
+    reports = {}
+    all_sizes = {}
+    for name, theme in themes.items():
+        sizes = all_sizes[name] = variable_sizes(theme)
+        modes = {mode: sum(mode_sizes.values()) for mode, mode_sizes in sizes.items()}
+        largest = sorted(
+            (
+                {"mode": mode, "variable": variable, "bytes": size}
+                for mode, mode_sizes in sizes.items()
+                for variable, size in mode_sizes.items()
+            ),
+            key=lambda item: item["bytes"],
+            reverse=True,
+        )
+        reports[name] = {
+            "variant": variant,
+            "bytes": _json_size(theme),
+            "modes": modes,
+            "dark_vs_light_bytes": modes.get("dark", 0) - modes.get("light", 0),
+            "largest": largest[:top],
+        }
+    return reports, all_sizes
+
+
+def compare_variants(full, lite):
+    """Return the size difference of a Lite theme report against its Full one."""
+    return {
+        "bytes": lite["bytes"] - full["bytes"],
+        "modes": {
+            mode: lite["modes"].get(mode, 0) - full["modes"].get(mode, 0)
+            for mode in dict.fromkeys([*full["modes"], *lite["modes"]])
+        },
+    }
+
+
+def budget_violations(reports, sizes, max_theme_bytes=None, max_variable_bytes=None):
+    """Return a description of every theme or variable over its byte budget.
+
+    ``reports`` and ``sizes`` are as returned by ``analyze_themes``.
+    """
+    violations = []
+    for name, report in reports.items():
+        if max_theme_bytes is not None and report["bytes"] > max_theme_bytes:
+            violations.append(
+                f"{name}: {report['bytes']} bytes exceeds the theme budget of "
+                f"{max_theme_bytes} bytes"
+            )
+        if max_variable_bytes is None:
+            continue
+        for mode, mode_sizes in sizes[name].items():
+            for variable, size in mode_sizes.items():
+                if size > max_variable_bytes:
+                    violations.append(
+                        f"{name} ({mode}) {variable}: {size} bytes exceeds the "
+                        f"variable budget of {max_variable_bytes} bytes"
+                    )
+    return violations
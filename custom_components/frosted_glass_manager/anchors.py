@@ -0,0 +1,46 @@
+"""YAML anchors for theme variables whose value is repeated."""
+from .template_index import apply_edits, index_template
+
+# Anchor plus alias cost about this many bytes; shorter values are left alone.
+MIN_ALIAS_SAVING = 8
+
+
+def repeated_value_edits(template, modes, skip, index):
+    """Return the edits of ``alias_repeated_values``, for ``apply_edits``."""
+    entries = [entry for mode in modes for entry in index.entries.get(mode, ())]
+
+    # value text -> [offset of its first value, anchor name once aliased]
+    first = {}
+    anchors = 0
+    edits = []
+    for key, _, value_start, end in entries:
+        value = template[value_start:end]
+        if not value.strip() or skip(key, value):
+            continue
+        if value not in first:
+            first[value] = [value_start, None]
+            continue
+        anchor_start, anchor = first[value]
+        if anchor is None:
+            anchor = f"v{anchors + 1}"
+            if len(value) - len(anchor) * 2 < MIN_ALIAS_SAVING:
+                continue
+            anchors += 1
+            first[value][1] = anchor
+            edits.append((anchor_start, anchor_start, f" &{anchor}"))
+        edits.append((value_start, end, f" *{anchor}\n"))
+    return sorted(edits)
+
+
+def alias_repeated_values(template, modes, skip, index=None):
+    """Write every repeated value once, as a YAML anchor, and alias the rest.
+
+    Entries of the ``modes`` mappings are scanned in template order; the
+    first entry with a given value text gets an anchor and later entries
+    with the identical text become aliases of it. Entries that are
+    ``skip``-ped, or whose alias would not be shorter than the value, are
+    left alone, so the loaded theme is exactly the same.
+    """
+    index = index or index_template(template)
+    edits = repeated_value_edits(template, modes, skip, index)
+    return apply_edits(template, index, edits)[0]
@@ -12,12 +12,28 @@ from .const import (
     CONF_LIGHT_BG,
     CONF_DARK_PRIMARY,
     CONF_DARK_BG,
+    CONF_LIGHT_ACCENT,
+    CONF_DARK_ACCENT,
     CONF_RESET,
+    CONF_DEBOUNCE_MS,
+    CONF_MIRROR_BACKGROUNDS,
+    CONF_OPTIMIZE_BACKGROUNDS,
+    CONF_BLUR_LITE_BACKGROUND,
+    CONF_MINIFY_CSS,
+    CONF_YAML_ANCHORS,
+    CONF_IN_MEMORY_THEMES,
+    CONF_EXPORT_THEME_FILES,
+    CONF_THEME_NAME,
+    DEFAULT_THEME_NAME,
+    DEFAULT_DEBOUNCE_MS,
+    MIN_DEBOUNCE_MS,
+    MAX_DEBOUNCE_MS,
     DEFAULT_LIGHT_RGB,
     DEFAULT_DARK_RGB,
     DEFAULT_LIGHT_BG_URL,
     DEFAULT_DARK_BG_URL,
 )
+from . import entry_theme_name, is_foreign_theme_file, theme_filenames
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,14 +43,39 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
     async def async_step_user(self, user_input=None):
-        """Handle the initial step."""
-        if self._async_current_entries():
-            return self.async_abort(reason="single_instance_allowed")
-
+        """Handle the initial step: name the new theme."""
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="Frosted Glass Manager", data={})
+            name = " ".join(user_input[CONF_THEME_NAME].split())
+            # Every entry writes its own files, so names must not collide
+            # on case-insensitive file systems either.
+            used = {
+                filename.casefold()
+                for entry in self._async_current_entries()
+                for filename in theme_filenames(entry_theme_name(entry))
+            }
+            if not name:
+                errors[CONF_THEME_NAME] = "invalid_name"
+            elif any(filename.casefold() in used for filename in theme_filenames(name)):
+                errors[CONF_THEME_NAME] = "name_exists"
+            elif await self._async_any_foreign_file(theme_filenames(name)):
+                # Setup would overwrite it and removing the entry delete it
+                errors[CONF_THEME_NAME] = "file_exists"
+            else:
+                return self.async_create_entry(title=name, data={CONF_THEME_NAME: name})
+
+        default_name = "" if self._async_current_entries() else DEFAULT_THEME_NAME
+        schema = vol.Schema(
+            {vol.Required(CONF_THEME_NAME, default=default_name): selector.TextSelector()}
+        )
+        return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
 
-        return self.async_show_form(step_id="user")
+    async def _async_any_foreign_file(self, filenames):
+        """Return True if any of ``filenames`` is a theme file we did not write."""
+        for filename in filenames:
+            if await self.hass.async_add_executor_job(is_foreign_theme_file, self.hass, filename):
+                return True
+        return False
 
     @staticmethod
     @callback
@@ -70,6 +111,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 user_input[CONF_LIGHT_BG] = DEFAULT_LIGHT_BG_URL
                 user_input[CONF_DARK_PRIMARY] = str_to_list(DEFAULT_DARK_RGB)
                 user_input[CONF_DARK_BG] = DEFAULT_DARK_BG_URL
+                user_input.pop(CONF_LIGHT_ACCENT, None)
+                user_input.pop(CONF_DARK_ACCENT, None)
                 
                 # Dôležité: Resetneme checkbox na False, aby pri ďalšom otvorení nebol zaškrtnutý
                 user_input[CONF_RESET] = False
@@ -93,6 +136,16 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         val_light_bg = self.config_entry.options.get(CONF_LIGHT_BG, DEFAULT_LIGHT_BG_URL)
         val_dark_prim = self.config_entry.options.get(CONF_DARK_PRIMARY, DEFAULT_DARK_RGB)
         val_dark_bg = self.config_entry.options.get(CONF_DARK_BG, DEFAULT_DARK_BG_URL)
+        val_light_accent = self.config_entry.options.get(CONF_LIGHT_ACCENT)
+        val_dark_accent = self.config_entry.options.get(CONF_DARK_ACCENT)
+        val_debounce = self.config_entry.options.get(CONF_DEBOUNCE_MS, DEFAULT_DEBOUNCE_MS)
+        val_mirror = self.config_entry.options.get(CONF_MIRROR_BACKGROUNDS, False)
+        val_optimize = self.config_entry.options.get(CONF_OPTIMIZE_BACKGROUNDS, False)
+        val_blur_lite = self.config_entry.options.get(CONF_BLUR_LITE_BACKGROUND, False)
+        val_minify = self.config_entry.options.get(CONF_MINIFY_CSS, False)
+        val_anchors = self.config_entry.options.get(CONF_YAML_ANCHORS, False)
+        val_in_memory = self.config_entry.options.get(CONF_IN_MEMORY_THEMES, False)
+        val_export = self.config_entry.options.get(CONF_EXPORT_THEME_FILES, False)
 
         schema = vol.Schema(
             {
@@ -117,6 +170,44 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_DARK_BG,
                     default=val_dark_bg
                 ): selector.TextSelector(),
+
+                # Left empty, the accent color follows the primary color
+                vol.Optional(
+                    CONF_LIGHT_ACCENT,
+                    description={"suggested_value": val_light_accent},
+                ): selector.ColorRGBSelector(),
+
+                vol.Optional(
+                    CONF_DARK_ACCENT,
+                    description={"suggested_value": val_dark_accent},
+                ): selector.ColorRGBSelector(),
+
+                vol.Optional(CONF_MIRROR_BACKGROUNDS, default=val_mirror): bool,
+
+                vol.Optional(CONF_OPTIMIZE_BACKGROUNDS, default=val_optimize): bool,
+
+                vol.Optional(CONF_BLUR_LITE_BACKGROUND, default=val_blur_lite): bool,
+
+                vol.Optional(CONF_MINIFY_CSS, default=val_minify): bool,
+
+                vol.Optional(CONF_YAML_ANCHORS, default=val_anchors): bool,
+
+                vol.Optional(CONF_IN_MEMORY_THEMES, default=val_in_memory): bool,
+
+                vol.Optional(CONF_EXPORT_THEME_FILES, default=val_export): bool,
+
+                vol.Required(
+                    CONF_DEBOUNCE_MS,
+                    default=val_debounce
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=MIN_DEBOUNCE_MS,
+                        max=MAX_DEBOUNCE_MS,
+                        step=50,
+                        unit_of_measurement="ms",
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
             }
         )
 
@@ -0,0 +1,118 @@
+"""Reduced-transparency fallbacks derived from the backdrop blurs of a theme."""
+import re
+
+from .minify import COMMENT_PATTERN, split_declarations
+
+FALLBACK_MEDIA = "(prefers-reduced-transparency: reduce), (prefers-reduced-motion: reduce)"
+
+# Alpha given to translucent tints once the blur behind them is gone
+OPAQUE_ALPHA = 0.9
+
+RGBA_PATTERN = re.compile(r"(rgba\(\s*[^,()]+,\s*[^,()]+,\s*[^,()]+,\s*)([\d.]+)(\s*\))")
+IMPORTANT_SUFFIX = re.compile(r"\s*!important\s*$")
+BRACE_PATTERN = re.compile(r"[{}]")
+BACKDROP_FILTER = "backdrop-filter"
+
+
+def _top_level_rules(css):
+    """Return the (selector, declarations) of the style rules outside at-rules."""
+    css = COMMENT_PATTERN.sub(" ", css)
+    rules = []
+    depth = 0
+    selector_start = body_start = 0
+    selector = ""
+    # Only the braces matter, so jump from one to the next.
+    for match in BRACE_PATTERN.finditer(css):
+        pos = match.start()
+        char = match.group()
+        if char == "{":
+            if depth == 0:
+                selector = css[selector_start:pos].strip()
+                body_start = pos + 1
+            depth += 1
+        elif char == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                body = css[body_start:pos]
+                # Stray declarations before a rule make its selector invalid;
+                # browsers drop such rules, so they need no fallback either.
+                if "{" not in body and not selector.startswith("@") and not (
+                    ";" in selector or "}" in selector
+                ):
+                    rules.append((selector, body))
+                selector_start = pos + 1
+    return rules
+
+
+def _is_backdrop_filter(prop):
+    return prop in ("backdrop-filter", "-webkit-backdrop-filter") or (
+        prop.startswith("--") and prop.endswith("backdrop-filter")
+    )
+
+
+def _opaque(value):
+    """Raise every translucent rgba() alpha in ``value`` to ``OPAQUE_ALPHA``."""
+
+    def replace(match):
+        if float(match.group(2)) >= OPAQUE_ALPHA:
+            return match.group(0)
+        return f"{match.group(1)}{OPAQUE_ALPHA}{match.group(3)}"
+
+    return RGBA_PATTERN.sub(replace, value)
+
+
+def _fallback_declarations(body):
+    """Return the declarations replacing the glass effect of one rule.
+
+    Backdrop filters are turned off, and the rule's translucent background
+    and tint colors become nearly opaque. Rules without a backdrop filter
+    return nothing.
+    """
+    if BACKDROP_FILTER not in body.lower():
+        return []
+    blurs = []
+    tints = []
+    for declaration in split_declarations(body):
+        prop, sep, value = declaration.partition(":")
+        prop = prop.strip().lower()
+        if not sep:
+            continue
+        if _is_backdrop_filter(prop):
+            value = IMPORTANT_SUFFIX.sub("", value).strip()
+            if value and value != "none":
+                blurs.append(f"{prop}: none !important;")
+        elif "background" in prop or "tint" in prop:
+            value = IMPORTANT_SUFFIX.sub("", value).strip()
+            opaque = _opaque(value)
+            if opaque != value:
+                tints.append(f"{prop}: {opaque} !important;")
+    return blurs + tints if blurs else []
+
+
+def reduced_transparency_css(css):
+    """Build the reduced-transparency branch for the rules of ``css``.
+
+    Every top-level rule with a backdrop filter gets a counterpart inside a
+    ``prefers-reduced-transparency`` / ``prefers-reduced-motion`` media
+    query. Returns an empty string if ``css`` has no backdrop filters.
+    """
+    if BACKDROP_FILTER not in css.lower():
+        return ""
+    lines = []
+    for selector, body in _top_level_rules(css):
+        declarations = _fallback_declarations(body)
+        if not declarations:
+            continue
+        lines.append(f"  {' '.join(selector.split())} {{")
+        lines += [f"    {declaration}" for declaration in declarations]
+        lines.append("  }")
+    if not lines:
+        return ""
+    return "\n".join(
+        [
+            "/* Reduced transparency / motion: no backdrop blur, opaque tints */",
+            f"@media {FALLBACK_MEDIA} {{",
+            *lines,
+            "}",
+        ]
+    )
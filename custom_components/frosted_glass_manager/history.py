@@ -0,0 +1,149 @@
+"""Bounded history of the rendered theme files, for instant rollback."""
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+
+from homeassistant.util import dt as dt_util
+
+from .writer import known_digest, write_if_changed
+
+_LOGGER = logging.getLogger(__name__)
+
+INDEX_FILENAME = "history.json"
+
+
+class ThemeHistory:
+    """Compressed copies of the last theme sets rendered for one entry.
+
+    Each item holds the files of one render, keyed by the fingerprint of
+    its inputs, and the options it was rendered from; items are kept
+    newest first. The history is bounded by item count and by compressed
+    size; a pinned item (the pristine defaults) is never evicted. All
+    methods do blocking I/O and must run in the executor.
+    """
+
+    def __init__(self, directory, max_items, max_bytes):
+        """Initialize the history stored in ``directory``."""
+        self._directory = directory
+        self._max_items = max_items
+        self._max_bytes = max_bytes
+        self._items = None
+        self._lock = threading.Lock()
+
+    def _index_path(self):
+        return os.path.join(self._directory, INDEX_FILENAME)
+
+    def _load(self):
+        """Load the index, forgetting items whose files have gone missing."""
+        if self._items is not None:
+            return self._items
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            items = []
+        self._items = [
+            item
+            for item in items
+            if all(
+                os.path.isfile(os.path.join(self._directory, item["fingerprint"], name))
+                for name in item["files"].values()
+            )
+        ]
+        return self._items
+
+    def _save(self):
+        os.makedirs(self._directory, exist_ok=True)
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._items, f, indent=2)
+        os.replace(tmp_path, self._index_path())
+
+    def _evict(self):
+        """Drop the oldest unpinned items until the history fits its bounds."""
+        items = self._items
+        while len(items) > 1 and (
+            len(items) > self._max_items
+            or sum(item["bytes"] for item in items) > self._max_bytes
+        ):
+            unpinned = [item for item in items[1:] if not item["pinned"]]
+            if not unpinned:
+                break
+            item = unpinned[-1]
+            items.remove(item)
+            shutil.rmtree(os.path.join(self._directory, item["fingerprint"]), ignore_errors=True)
+            _LOGGER.debug(f"Frosted Glass Manager: evicted theme history {item['fingerprint']}")
+
+    def items(self):
+        """Return the history items, newest first."""
+        with self._lock:
+            return list(self._load())
+
+    def record(self, fingerprint, paths, options, pinned=False):
+        """Store the files of a render and make it the newest item.
+
+        ``paths`` maps each theme file name to its path on disk. With
+        ``pinned``, this item replaces any earlier pinned one.
+        """
+        with self._lock:
+            items = self._load()
+            existing = next(
+                (item for item in items if item["fingerprint"] == fingerprint), None
+            )
+            if existing is not None:
+                items.remove(existing)
+                item = existing
+            else:
+                item_dir = os.path.join(self._directory, fingerprint)
+                os.makedirs(item_dir, exist_ok=True)
+                files = {}
+                size = 0
+                for filename, path in paths.items():
+                    name = f"{len(files)}.yaml.gz"
+                    with open(path, "rb") as src, gzip.open(
+                        os.path.join(item_dir, name), "wb"
+                    ) as dst:
+                        shutil.copyfileobj(src, dst)
+                    files[filename] = name
+                    size += os.path.getsize(os.path.join(item_dir, name))
+                item = {
+                    "fingerprint": fingerprint,
+                    "created": dt_util.utcnow().isoformat(),
+                    "options": options,
+                    "files": files,
+                    "bytes": size,
+                    "pinned": False,
+                }
+            if pinned:
+                for other in items:
+                    other["pinned"] = False
+                item["pinned"] = True
+            items.insert(0, item)
+            self._evict()
+            self._save()
+            return item
+
+    def restore(self, fingerprint, themes_dir):
+        """Write the files of an item back to ``themes_dir``.
+
+        The item becomes the newest one. Returns ``{filename: digest}`` of
+        the restored files.
+        """
+        with self._lock:
+            items = self._load()
+            item = next(item for item in items if item["fingerprint"] == fingerprint)
+            digests = {}
+            for filename, name in item["files"].items():
+                path = os.path.join(self._directory, fingerprint, name)
+                with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+                    content = f.read()
+                path = os.path.join(themes_dir, filename)
+                write_if_changed(path, content)
+                digests[filename] = known_digest(path)
+            items.remove(item)
+            items.insert(0, item)
+            self._save()
+            return digests
@@ -0,0 +1,68 @@
+"""Conservative CSS minifier for the card-mod blocks of the generated themes."""
+import re
+
+COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+PUNCTUATION_PATTERN = re.compile(r" ?([{};]) ?")
+COLON_PATTERN = re.compile(r": ")
+IMPORTANT_PATTERN = re.compile(r" !important")
+DECLARATIONS_PATTERN = re.compile(r"\{([^{}]*)\}")
+# The characters that can end a declaration or hide a semicolon
+DECLARATION_BREAK_PATTERN = re.compile(r"['\"();]")
+
+
+def split_declarations(text):
+    """Split a declaration list on semicolons outside quotes and parentheses."""
+    if "'" not in text and '"' not in text and "(" not in text:
+        return [part for part in text.split(";") if part]
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for match in DECLARATION_BREAK_PATTERN.finditer(text):
+        pos = match.start()
+        char = match.group()
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif char == ";" and depth == 0:
+            parts.append(text[start:pos])
+            start = pos + 1
+    parts.append(text[start:])
+    return [part for part in parts if part]
+
+
+def _dedupe_declarations(match):
+    """Keep only the last of identical declarations inside one block.
+
+    Repeated properties with different values are kept: they are usually
+    deliberate fallbacks for browsers that reject the later value.
+    """
+    seen = set()
+    kept = []
+    for declaration in reversed(split_declarations(match.group(1))):
+        if declaration not in seen:
+            seen.add(declaration)
+            kept.append(declaration)
+    return "{" + ";".join(reversed(kept)) + "}"
+
+
+def minify_css(text):
+    """Return ``text`` without comments, redundant whitespace and duplicates.
+
+    Spaces after commas are kept, so values such as ``106, 116, 211`` are
+    left untouched and still match the template slots.
+    """
+    text = COMMENT_PATTERN.sub(" ", text)
+    text = WHITESPACE_PATTERN.sub(" ", text)
+    text = PUNCTUATION_PATTERN.sub(r"\1", text)
+    text = COLON_PATTERN.sub(":", text)
+    text = IMPORTANT_PATTERN.sub("!important", text)
+    text = DECLARATIONS_PATTERN.sub(_dedupe_declarations, text)
+    return text.strip()
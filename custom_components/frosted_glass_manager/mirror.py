@@ -0,0 +1,214 @@
+"""Local mirror of the theme background images."""
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from urllib.parse import urlparse
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "mirror.json"
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+FETCH_CHUNK_BYTES = 64 * 1024
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+
+def is_remote(url):
+    """Return True if ``url`` points to an http(s) resource."""
+    return urlparse(url).scheme in ("http", "https")
+
+
+def _extension(url, content_type):
+    """Pick a file extension from the URL path, falling back to the content type."""
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    if ext in (".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif", ".svg"):
+        return ext
+    if content_type:
+        guessed = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if guessed:
+            return guessed
+    return ".img"
+
+
+class BackgroundMirror:
+    """Download background images once and serve them from ``www/``.
+
+    Each image is stored under a content-hashed filename, so a changed image
+    gets a new URL and browsers never see a stale cached copy. The manifest
+    remembers the validators of every source URL, and later resolves only
+    send conditional requests. Files no longer referenced are evicted.
+    """
+
+    def __init__(self, hass: HomeAssistant, session, directory, url_prefix):
+        """Initialize the mirror.
+
+        ``directory`` is where images are stored and ``url_prefix`` is the
+        path the frontend serves that directory under.
+        """
+        self._hass = hass
+        self._session = session
+        self._directory = directory
+        self._url_prefix = url_prefix.rstrip("/")
+        self._manifest = None
+        self._lock = asyncio.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self._directory, MANIFEST_FILENAME)
+
+    def _load_manifest(self):
+        """Load the manifest, forgetting records whose file has gone missing."""
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {
+            url: record
+            for url, record in manifest.items()
+            if os.path.isfile(os.path.join(self._directory, record["file"]))
+        }
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self._directory, exist_ok=True)
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _store(self, filename, body):
+        os.makedirs(self._directory, exist_ok=True)
+        path = os.path.join(self._directory, filename)
+        if not os.path.exists(path):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+
+    def _evict(self, keep):
+        """Remove mirrored images that are not in ``keep``."""
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return
+        for name in names:
+            if name == MANIFEST_FILENAME or name in keep:
+                continue
+            if os.path.isdir(os.path.join(self._directory, name)):
+                continue
+            try:
+                os.remove(os.path.join(self._directory, name))
+                _LOGGER.debug(f"Frosted Glass Manager: evicted stale background {name}")
+            except OSError as e:
+                _LOGGER.warning(f"Frosted Glass Manager: could not evict {name}: {e}")
+
+    def local_url(self, filename):
+        """Return the frontend URL of a mirrored file."""
+        return f"{self._url_prefix}/{filename}"
+
+    def local_path(self, url):
+        """Return the path of the mirrored copy of ``url``, or None."""
+        record = (self._manifest or {}).get(url)
+        if record is None:
+            return None
+        return os.path.join(self._directory, record["file"])
+
+    async def _async_fetch(self, url, cached):
+        """Fetch or revalidate one URL and return its manifest record."""
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._session.get(url, headers=headers, timeout=FETCH_TIMEOUT) as resp:
+            if resp.status == 304 and cached is not None:
+                return cached
+            resp.raise_for_status()
+            if resp.content_length and resp.content_length > MAX_IMAGE_BYTES:
+                raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+            # read(n) returns what is buffered so far; read to EOF, capped.
+            chunks = []
+            size = 0
+            async for chunk in resp.content.iter_chunked(FETCH_CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+                chunks.append(chunk)
+            body = b"".join(chunks)
+            content_type = resp.headers.get("Content-Type")
+            record = {
+                "file": hashlib.sha256(body).hexdigest()[:16] + _extension(url, content_type),
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+
+        await self._hass.async_add_executor_job(self._store, record["file"], body)
+        return record
+
+    async def async_resolve(self, urls):
+        """Mirror ``urls`` and return a mapping of source URL to local URL.
+
+        URLs that are not remote, or that cannot be fetched and have never
+        been mirrored before, are left out so callers keep the original.
+        """
+        async with self._lock:
+            return await self._async_resolve(urls)
+
+    async def async_resolve_cached(self, urls):
+        """Return the local URLs of ``urls`` mirrored before, without fetching.
+
+        That is what ``async_resolve`` returns when no source has changed.
+        """
+        async with self._lock:
+            await self._async_load_manifest()
+            return {
+                url: self.local_url(self._manifest[url]["file"])
+                for url in dict.fromkeys(urls)
+                if is_remote(url) and url in self._manifest
+            }
+
+    async def _async_load_manifest(self):
+        if self._manifest is None:
+            self._manifest = await self._hass.async_add_executor_job(self._load_manifest)
+
+    async def _async_resolve(self, urls):
+        await self._async_load_manifest()
+
+        remote = [url for url in dict.fromkeys(urls) if is_remote(url)]
+        results = await asyncio.gather(
+            *(self._async_fetch(url, self._manifest.get(url)) for url in remote),
+            return_exceptions=True,
+        )
+
+        manifest = {}
+        resolved = {}
+        for url, result in zip(remote, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                _LOGGER.warning(
+                    f"Frosted Glass Manager: could not mirror background {url}: {result}"
+                )
+                result = self._manifest.get(url)
+                if result is None:
+                    continue
+            manifest[url] = result
+            resolved[url] = self.local_url(result["file"])
+
+        keep = {record["file"] for record in manifest.values()}
+
+        def _commit():
+            self._save_manifest(manifest)
+            self._evict(keep)
+
+        if manifest != self._manifest:
+            await self._hass.async_add_executor_job(_commit)
+        self._manifest = manifest
+        return resolved
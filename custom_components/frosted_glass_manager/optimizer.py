@@ -0,0 +1,226 @@
+"""Downscaled, recompressed renditions of the theme background images."""
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+_LOGGER = logging.getLogger(__name__)
+
+RENDITIONS_DIR = "renditions"
+RENDITION_WIDTHS = (800, 1280, 1920, 2560)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+INDEX_FILENAME = "renditions.json"
+
+# Pre-blurred backgrounds are small: the blur removes all fine detail anyway.
+BLURRED_WIDTH = 1280
+# Viewport width the CSS blur radius is matched at.
+BLUR_REFERENCE_WIDTH = 1920
+
+
+def load_pillow():
+    """Import Pillow on first use; return None if it is not installed."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def source_digest(path):
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _target_widths(source_width):
+    """Return the rendition widths to produce, never upscaling the source."""
+    widths = [width for width in RENDITION_WIDTHS if width < source_width]
+    widths.append(min(source_width, RENDITION_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def build_renditions(source_path, cache_dir):
+    """Create the renditions of one image and return ``(key, index)``.
+
+    Renditions are cached under ``cache_dir/<key>``, where ``key`` is
+    derived from the source digest, so each image is only processed once.
+    The index is a list of ``{"width", "webp", "jpeg"}`` entries (file paths
+    relative to ``cache_dir``), sorted by width. Returns None if Pillow is
+    unavailable.
+    """
+    Image = load_pillow()
+    if Image is None:
+        return None
+
+    key = source_digest(source_path)[:16]
+    target_dir = os.path.join(cache_dir, key)
+    index_path = os.path.join(target_dir, INDEX_FILENAME)
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            return key, json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    os.makedirs(target_dir, exist_ok=True)
+    with Image.open(source_path) as source:
+        widths = _target_widths(source.width)
+        largest = widths[-1]
+        largest_size = (largest, max(1, round(source.height * largest / source.width)))
+        # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding.
+        source.draft("RGB", largest_size)
+        image = source.convert("RGB")
+
+    index = []
+    for width in reversed(widths):
+        height = max(1, round(image.height * width / image.width))
+        if image.width != width:
+            image = image.resize((width, height), Image.LANCZOS)
+        webp = f"{key}/{width}.webp"
+        jpeg = f"{key}/{width}.jpg"
+        image.save(os.path.join(cache_dir, webp), "WEBP", quality=WEBP_QUALITY, method=4)
+        image.save(
+            os.path.join(cache_dir, jpeg),
+            "JPEG",
+            quality=JPEG_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        index.append({"width": width, "webp": webp, "jpeg": jpeg})
+
+    index.sort(key=lambda item: item["width"])
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    return key, index
+
+
+def _saturation_matrix(amount):
+    """Return the RGB conversion matrix of the CSS ``saturate()`` filter."""
+    return (
+        0.213 + 0.787 * amount, 0.715 - 0.715 * amount, 0.072 - 0.072 * amount, 0,
+        0.213 - 0.213 * amount, 0.715 + 0.285 * amount, 0.072 - 0.072 * amount, 0,
+        0.213 - 0.213 * amount, 0.715 - 0.715 * amount, 0.072 + 0.928 * amount, 0,
+    )
+
+
+def build_blurred(source_path, cache_dir, blur_px, saturate):
+    """Create a blurred, saturated copy of one image and return ``(key, path)``.
+
+    The result matches the CSS ``blur(<blur_px>px) saturate(<saturate>)``
+    filter at a viewport of ``BLUR_REFERENCE_WIDTH`` pixels. It is cached
+    under ``cache_dir/<key>`` by source digest and filter parameters; the
+    returned path is relative to ``cache_dir``. Returns None if Pillow is
+    unavailable.
+    """
+    Image = load_pillow()
+    if Image is None:
+        return None
+    from PIL import ImageFilter
+
+    key = source_digest(source_path)[:16]
+    filename = f"{key}/blur-{blur_px:g}-saturate-{saturate:g}.jpg"
+    path = os.path.join(cache_dir, filename)
+    if os.path.isfile(path):
+        return key, filename
+
+    os.makedirs(os.path.join(cache_dir, key), exist_ok=True)
+    with Image.open(source_path) as source:
+        width = min(source.width, BLURRED_WIDTH)
+        size = (width, max(1, round(source.height * width / source.width)))
+        source.draft("RGB", size)
+        image = source.convert("RGB")
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+
+    image = image.filter(ImageFilter.GaussianBlur(blur_px * width / BLUR_REFERENCE_WIDTH))
+    if saturate != 1:
+        image = image.convert("RGB", _saturation_matrix(saturate))
+
+    tmp_path = path + ".tmp"
+    image.save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+    return key, filename
+
+
+def blurred_card_css(url, tint=None):
+    """Return card-mod-card CSS showing a pre-blurred background behind cards.
+
+    The blurred image covers each card, under ``tint`` (the Full theme's
+    glass tint) if given. It scrolls with the card: a fixed background
+    is repainted on every scroll and ignored by most mobile browsers.
+    """
+    layers = [f"center / cover no-repeat url('{url}')"]
+    if tint:
+        layers.insert(0, f"linear-gradient({tint}, {tint})")
+    return "\n".join(
+        [
+            "/* Pre-blurred background */",
+            "ha-card {",
+            f"  background: {', '.join(layers)};",
+            "}",
+        ]
+    )
+
+
+def evict_renditions(cache_dir, keep):
+    """Remove cached rendition sets whose source digest key is not in ``keep``."""
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if name in keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        _LOGGER.debug(f"Frosted Glass Manager: evicted background renditions {name}")
+
+
+def _background(url):
+    return f"center / cover no-repeat fixed url('{url}')"
+
+
+def _image_set(url_prefix, index, position):
+    """Return an image-set() offering a rendition at 1x and, if any, 2x."""
+    entry = index[position]
+    candidates = [f"url('{url_prefix}/{entry['webp']}') type('image/webp') 1x"]
+    for larger in index[position + 1:]:
+        if larger["width"] >= entry["width"] * 2 or larger is index[-1]:
+            candidates.append(f"url('{url_prefix}/{larger['webp']}') type('image/webp') 2x")
+            break
+    return f"center / cover no-repeat fixed image-set({', '.join(candidates)})"
+
+
+def rendition_css(url_prefix, index):
+    """Return card-mod-root CSS selecting a rendition by viewport width.
+
+    JPEG renditions are picked by ``max-width`` media queries. Browsers that
+    understand typed ``image-set()`` get WebP instead, with a 2x candidate
+    for high-density screens.
+    """
+    if not index:
+        return ""
+
+    def rules(value):
+        # Largest first, so the narrowest matching query is declared last.
+        lines = [f":host {{ --lovelace-background: {value(len(index) - 1)}; }}"]
+        for position in range(len(index) - 2, -1, -1):
+            lines.append(
+                f"@media (max-width: {index[position]['width']}px) {{ "
+                f":host {{ --lovelace-background: {value(position)}; }} }}"
+            )
+        return lines
+
+    lines = ["/* Background renditions */"]
+    lines += rules(lambda position: _background(f"{url_prefix}/{index[position]['jpeg']}"))
+    probe = "image-set(url('x.webp') type('image/webp') 1x)"
+    lines.append(f"@supports (background-image: {probe}) {{")
+    lines += [
+        "  " + line
+        for line in rules(lambda position: _image_set(url_prefix, index, position))
+    ]
+    lines.append("}")
+    return "\n".join(lines)
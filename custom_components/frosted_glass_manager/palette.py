@@ -0,0 +1,128 @@
+"""Tonal palette engine for the Frosted Glass Theme Manager."""
+import colorsys
+from functools import lru_cache
+
+FALLBACK_RGB = (106, 116, 211)
+
+# Target lightness per tone; None keeps the lightness of the source color.
+TONE_LIGHTNESS = (
+    ("05", 0.05),
+    ("10", 0.10),
+    ("20", 0.20),
+    ("30", 0.30),
+    ("40", 0.40),
+    ("50", None),
+    ("60", 0.60),
+    ("70", 0.70),
+    ("80", 0.80),
+    ("90", 0.90),
+    ("95", 0.96),
+)
+
+PALETTE_CACHE_SIZE = 256
+
+
+def normalize_rgb(rgb):
+    """Return ``rgb`` ("R, G, B" string or sequence) as an (r, g, b) tuple of ints."""
+    try:
+        if isinstance(rgb, str):
+            parts = [int(x) for x in rgb.split(",")]
+        else:
+            parts = [int(x) for x in rgb]
+        return parts[0], parts[1], parts[2]
+    except (TypeError, ValueError, IndexError):
+        return FALLBACK_RGB
+
+
+def _to_hex(r, g, b):
+    r = max(0, min(255, int(r * 255)))
+    g = max(0, min(255, int(g * 255)))
+    b = max(0, min(255, int(b * 255)))
+    return f"#{r:02X}{g:02X}{b:02X}"
+
+
+@lru_cache(maxsize=PALETTE_CACHE_SIZE)
+def _palette_for(rgb):
+    """Compute the palette of a normalized RGB tuple as (level, hex) pairs."""
+    r, g, b = rgb
+    h, l, s = colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0)
+    return tuple(
+        (level, _to_hex(*colorsys.hls_to_rgb(h, l if target_l is None else target_l, s)))
+        for level, target_l in TONE_LIGHTNESS
+    )
+
+
+def generate_hex_palette(rgb_str):
+    """
+    Generate a tonal palette (HEX strings) based on a single RGB string.
+    """
+    return dict(_palette_for(normalize_rgb(rgb_str)))
+
+
+def _load_numpy():
+    """Import NumPy on first use; importing it costs more than a render."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _v(np, m1, m2, hue):
+    """Vectorized ``colorsys._v``."""
+    hue = np.mod(hue, 1.0)
+    return np.select(
+        [hue < 1.0 / 6.0, hue < 0.5, hue < 2.0 / 3.0],
+        [m1 + (m2 - m1) * hue * 6.0, m2, m1 + (m2 - m1) * (2.0 / 3.0 - hue) * 6.0],
+        m1,
+    )
+
+
+def _batch_palettes_numpy(np, colors):
+    """Compute the palettes of many normalized RGB tuples at once."""
+    hls = np.array(
+        [colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0) for r, g, b in colors]
+    )
+    h = hls[:, 0:1]
+    s = hls[:, 2:3]
+    l = np.tile(
+        np.array([target_l or 0.0 for _, target_l in TONE_LIGHTNESS]), (len(colors), 1)
+    )
+    base = [i for i, (_, target_l) in enumerate(TONE_LIGHTNESS) if target_l is None]
+    l[:, base] = hls[:, 1:2]
+
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
+    channels = np.stack(
+        [
+            _v(np, m1, m2, h + 1.0 / 3.0),
+            _v(np, m1, m2, h),
+            _v(np, m1, m2, h - 1.0 / 3.0),
+        ],
+        axis=-1,
+    )
+    # colorsys returns the lightness unchanged for achromatic colors
+    channels = np.where((s == 0.0)[..., None], l[..., None], channels)
+    values = np.clip((channels * 255).astype(np.int64), 0, 255)
+
+    levels = [level for level, _ in TONE_LIGHTNESS]
+    return [
+        {level: "#%02X%02X%02X" % tuple(rgb) for level, rgb in zip(levels, row.tolist())}
+        for row in values
+    ]
+
+
+def generate_hex_palettes(rgb_values):
+    """Generate the palettes of many colors, in the order given.
+
+    Duplicate colors are computed once. The work is vectorized with NumPy
+    when it is installed; otherwise the memoized single-color path is used.
+    """
+    colors = [normalize_rgb(rgb) for rgb in rgb_values]
+    unique = list(dict.fromkeys(colors))
+    np = _load_numpy() if len(unique) > 1 else None
+    if np is None:
+        computed = {rgb: dict(_palette_for(rgb)) for rgb in unique}
+    else:
+        computed = dict(zip(unique, _batch_palettes_numpy(np, unique)))
+    return [dict(computed[rgb]) for rgb in colors]
@@ -0,0 +1,609 @@
+"""Compiled single-pass renderer for the Frosted Glass theme templates."""
+import gzip
+import json
+import os
+import re
+import threading
+
+from .const import (
+    TEMPLATES_DIR,
+    DEFAULT_LIGHT_RGB,
+    DEFAULT_DARK_RGB,
+    DEFAULT_LIGHT_BG_URL,
+    DEFAULT_DARK_BG_URL,
+    DEFAULT_PALETTE,
+)
+from .anchors import repeated_value_edits
+from .fallbacks import reduced_transparency_css
+from .minify import minify_css
+from .template_index import apply_edits, index_template
+
+MODE_LIGHT = "light"
+MODE_DARK = "dark"
+# Slots outside the modes, such as the theme name
+SCOPE_THEME = "theme"
+
+SLOT_PRIMARY = "primary"
+SLOT_ACCENT = "accent"
+SLOT_INFO = "info"
+SLOT_BACKGROUND = "background"
+SLOT_TONE = "tone_"
+SLOT_ROOT_CSS = "root_css"
+SLOT_CARD_CSS = "card_css"
+SLOT_THEME_NAME = "name"
+
+# Theme names that can be written as a plain YAML key
+PLAIN_KEY_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9 _.()-]*[A-Za-z0-9)]|[A-Za-z0-9]")
+
+# Variables holding the default primary RGB that play another color role;
+# None keeps the template's value. Every other variable is primary.
+ROLE_BINDINGS = {
+    "--token-rgb-cyan": None,
+    "--token-rgb-teal": SLOT_ACCENT,
+    "accent-color": SLOT_ACCENT,
+    "info-color": SLOT_INFO,
+    "label-badge-blue": SLOT_INFO,
+    "--token-color-feedback-info": SLOT_INFO,
+}
+
+# The YAML key or CSS property a value on a line belongs to
+VARIABLE_KEY_PATTERN = re.compile(r"([\w-]+)\s*:[^:;]*$")
+
+# Block scalars that get a slot appended for generated CSS
+BLOCK_SLOTS = {"card-mod-root": SLOT_ROOT_CSS, "card-mod-card": SLOT_CARD_CSS}
+
+BACKDROP_FILTER_PATTERN = re.compile(
+    r"--ha-card-backdrop-filter:\s*blur\(([\d.]+)px\)(?:\s*saturate\(([\d.]+)\))?"
+)
+GLASS_TINT_PATTERN = re.compile(r"--ha-card-glass-tint:\s*([^;]+);")
+
+# Placeholder for a slot while a template is parsed into a theme dict
+SLOT_SENTINEL = "ZzFrostedSlot{}zZ"
+SLOT_SENTINEL_PATTERN = re.compile(r"ZzFrostedSlot(\d+)zZ")
+
+
+class TemplateError(ValueError):
+    """Raised when a theme template cannot be compiled."""
+
+
+class CompiledTemplate:
+    """A theme template parsed once into literal segments and typed slots.
+
+    ``literals`` always holds one more entry than ``slots``; rendering
+    interleaves them, so the output is built with a single join.
+    ``block_slots`` lists the (slot index, indent) of slots appended to a
+    block scalar; their values are indented to match the block.
+    ``bytes_saved`` is the size removed by minifying the template or by
+    aliasing repeated values, if either was done.
+    ``scopes`` lists the scopes of the slots in template order; the slots
+    of each scope are contiguous, so the output splits into one fragment
+    per scope, see ``render_scope``.
+    ``slot_keys`` holds the variable (YAML key or CSS property) each slot
+    belongs to, or None; see ``bindings``.
+    """
+
+    __slots__ = (
+        "literals", "slots", "block_slots", "bytes_saved", "slot_keys", "scopes", "_ranges"
+    )
+
+    def __init__(self, literals, slots, block_slots=(), bytes_saved=0, slot_keys=None):
+        self.literals = literals
+        self.slots = slots
+        self.block_slots = block_slots
+        self.bytes_saved = bytes_saved
+        self.slot_keys = slot_keys or [None] * len(slots)
+        self.scopes = list(dict.fromkeys(scope for scope, _ in slots))
+        self._ranges = {}
+        for index, (scope, _) in enumerate(slots):
+            start, _ = self._ranges.get(scope, (index, index))
+            self._ranges[scope] = (start, index + 1)
+
+    def bindings(self, scope):
+        """Map each variable of ``scope`` to the slots it is built from."""
+        bindings = {}
+        for (slot_scope, slot), key in zip(self.slots, self.slot_keys):
+            if slot_scope == scope and key is not None:
+                bindings.setdefault(key, []).append(slot)
+        return bindings
+
+    def segments(self, values):
+        """Return the rendered template as a list of segments, in order.
+
+        The segments are the literals and slot values themselves, so the
+        list costs no copy of the template; see ``render`` for ``values``.
+        """
+        parts = [None] * (len(self.literals) + len(self.slots))
+        parts[0::2] = self.literals
+        parts[1::2] = [values[mode][slot] for mode, slot in self.slots]
+        for index, indent in self.block_slots:
+            text = parts[2 * index + 1]
+            if text:
+                parts[2 * index + 1] = indent_block(text, indent)
+        return parts
+
+    def render(self, values):
+        """Render the template.
+
+        ``values`` maps a mode to the slot values for that mode, see
+        ``mode_values``, and ``SCOPE_THEME`` to those of ``theme_values``.
+        """
+        return "".join(self.segments(values))
+
+    def render_scope(self, scope, values):
+        """Render the fragment of one scope.
+
+        ``values`` holds the slot values of that scope only. A fragment
+        runs from the literal before the scope's first slot up to its last
+        slot; the last scope also gets the trailing literal. Joining the
+        fragments of all ``scopes`` in order gives the same text as
+        ``render``.
+        """
+        start, end = self._ranges[scope]
+        indents = dict(self.block_slots)
+        parts = []
+        for index in range(start, end):
+            text = values[self.slots[index][1]]
+            if index in indents and text:
+                text = indent_block(text, indents[index])
+            parts.append(self.literals[index])
+            parts.append(text)
+        if end == len(self.slots):
+            parts.append(self.literals[-1])
+        return "".join(parts)
+
+
+class CompiledTheme:
+    """A theme template compiled to the theme dict it describes.
+
+    ``tree`` is the parsed theme with every string holding slots replaced
+    by a tuple of literal strings and (scope, slot, block) references;
+    rendering fills those in, so a theme dict is built without writing
+    or parsing any YAML.
+    """
+
+    __slots__ = ("tree",)
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def render(self, values):
+        """Return the theme dict for ``values``, as taken by ``CompiledTemplate.render``."""
+        return _render_node(self.tree, values)
+
+
+def _render_node(node, values):
+    if isinstance(node, dict):
+        return {key: _render_node(value, values) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_render_node(value, values) for value in node]
+    if isinstance(node, tuple):
+        parts = []
+        for part in node:
+            if isinstance(part, str):
+                parts.append(part)
+                continue
+            scope, slot, block = part
+            text = values[scope][slot]
+            parts.append(indent_block(text, "") if block else text)
+        return "".join(parts)
+    return node
+
+
+def _slot_parts(text, references):
+    """Split a parsed string on slot sentinels into literals and references."""
+    parts = []
+    pos = 0
+    for match in SLOT_SENTINEL_PATTERN.finditer(text):
+        scope, slot, block = references[int(match.group(1))]
+        end = match.end()
+        # A block slot fills whole lines, so its sentinel line goes entirely.
+        if block and text.startswith("\n", end):
+            end += 1
+        if match.start() > pos:
+            parts.append(text[pos:match.start()])
+        parts.append((scope, slot, block))
+        pos = end
+    if pos < len(text):
+        parts.append(text[pos:])
+    return tuple(parts)
+
+
+def _compile_node(node, references):
+    if isinstance(node, dict):
+        return {key: _compile_node(value, references) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_compile_node(value, references) for value in node]
+    if isinstance(node, str) and SLOT_SENTINEL_PATTERN.search(node):
+        return _slot_parts(node, references)
+    return node
+
+
+def compile_theme(compiled):
+    """Compile a ``CompiledTemplate`` into a ``CompiledTheme``.
+
+    The template is rendered once with a sentinel in every slot and parsed;
+    the theme name slot is dropped, as the theme dict does not include it.
+    The template must not use YAML anchors.
+    """
+    # PyYAML ships with Home Assistant; only this delivery mode needs it.
+    import yaml
+
+    references = []
+    values = {}
+    block_indexes = {index for index, _ in compiled.block_slots}
+    for index, (scope, slot) in enumerate(compiled.slots):
+        scope_values = values.setdefault(scope, {})
+        if slot not in scope_values:
+            scope_values[slot] = SLOT_SENTINEL.format(len(references))
+            references.append((scope, slot, index in block_indexes))
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    parsed = yaml.load(compiled.render(values), Loader=loader)
+    if not isinstance(parsed, dict) or len(parsed) != 1:
+        raise TemplateError("Template must define exactly one theme")
+    return CompiledTheme(_compile_node(next(iter(parsed.values())), references))
+
+
+def indent_block(text, indent):
+    """Indent every line of ``text`` for a YAML block scalar."""
+    return "".join(
+        f"{indent}{line}\n" if line.strip() else "\n" for line in text.splitlines()
+    )
+
+
+def mode_values(
+    primary, background, palette, root_css="", card_css="", accent=None, info=None
+):
+    """Build the slot values of a single mode.
+
+    ``root_css`` and ``card_css`` are appended to the mode's
+    ``card-mod-root`` and ``card-mod-card`` blocks. The ``accent`` and
+    ``info`` colors default to ``primary``.
+    """
+    values = {
+        SLOT_PRIMARY: primary,
+        SLOT_ACCENT: accent or primary,
+        SLOT_INFO: info or primary,
+        SLOT_BACKGROUND: background,
+        SLOT_ROOT_CSS: root_css,
+        SLOT_CARD_CSS: card_css,
+    }
+    for level, default_hex in DEFAULT_PALETTE.items():
+        values[SLOT_TONE + level] = palette.get(level, default_hex)
+    return values
+
+
+def theme_values(name):
+    """Build the slot values outside the modes for a theme called ``name``."""
+    return {SLOT_THEME_NAME: name if _is_plain_key(name) else json.dumps(name)}
+
+
+def _is_plain_key(name):
+    """Return whether ``name`` loads back as itself when written unquoted."""
+    if not PLAIN_KEY_PATTERN.fullmatch(name):
+        return False
+    import yaml
+
+    # Names such as "On", "Null" or "2024" resolve to booleans, None or numbers
+    try:
+        return yaml.safe_load(name) == name
+    except yaml.YAMLError:
+        return False
+
+
+def render_values(name, inputs, root_css=None, card_css=None, accents=None):
+    """Build the render values of the theme called ``name``.
+
+    ``inputs`` maps each mode to its (primary, background, palette);
+    ``root_css`` and ``card_css`` map modes to their extra card-mod CSS,
+    and ``accents`` to their accent color.
+    """
+    root_css = root_css or {}
+    card_css = card_css or {}
+    accents = accents or {}
+    values = {
+        mode: mode_values(
+            *mode_inputs,
+            root_css.get(mode, ""),
+            card_css.get(mode, ""),
+            accents.get(mode),
+        )
+        for mode, mode_inputs in inputs.items()
+    }
+    values[SCOPE_THEME] = theme_values(name)
+    return values
+
+
+def render_incremental(compiled, fingerprints, build_values, fragments):
+    """Render ``compiled``, reusing the fragments of unchanged scopes.
+
+    ``fingerprints`` maps every scope to a comparable summary of its inputs,
+    and ``build_values(scope)`` returns the slot values of a scope whose
+    fingerprint changed. ``fragments`` holds the fragments of the previous
+    render of the same file and is updated in place.
+    Returns the fragments in template order, which join to the rendered
+    text and can be written as they are, and the list of scopes rendered
+    again.
+    """
+    if fragments.get("compiled") is not compiled:
+        fragments.clear()
+        fragments["compiled"] = compiled
+        fragments["scopes"] = {}
+    cached = fragments["scopes"]
+    parts = []
+    rendered = []
+    for scope in compiled.scopes:
+        fingerprint = fingerprints[scope]
+        entry = cached.get(scope)
+        if entry is None or entry[0] != fingerprint:
+            entry = cached[scope] = (
+                fingerprint,
+                compiled.render_scope(scope, build_values(scope)),
+            )
+            rendered.append(scope)
+        parts.append(entry[1])
+    return parts, rendered
+
+
+def add_fallbacks(template, index=None):
+    """Append reduced-transparency fallbacks to every card-mod block scalar.
+
+    The fallbacks are derived from the backdrop filters of each block;
+    blocks without any are left unchanged.
+    """
+    index = index or index_template(template)
+    return apply_edits(template, index, _fallback_edits(template, index))[0]
+
+
+def _fallback_edits(template, index):
+    edits = []
+    for start, end, indent in index.block_ranges(BLOCK_SLOTS):
+        css = reduced_transparency_css(template[start:end])
+        if css:
+            edits.append((end, end, indent_block(css, indent)))
+    return edits
+
+
+def minify_blocks(template, index=None):
+    """Minify the CSS of every card-mod block scalar in ``template``.
+
+    Each block becomes a single line of CSS at the block's indentation, so
+    the YAML structure around it is unchanged.
+    """
+    index = index or index_template(template)
+    return apply_edits(template, index, _minify_edits(template, index))[0]
+
+
+def _minify_edits(template, index):
+    edits = []
+    for start, end, indent in index.block_ranges(BLOCK_SLOTS):
+        css = minify_css(template[start:end])
+        if css:
+            edits.append((start, end, f"{indent}{css}\n"))
+    return edits
+
+
+def _mode_tokens(default_rgb, default_bg):
+    """Map the literal default values of a mode to their slot names."""
+    tokens = {default_rgb: SLOT_PRIMARY, default_bg: SLOT_BACKGROUND}
+    for level, default_hex in DEFAULT_PALETTE.items():
+        tokens[default_hex] = SLOT_TONE + level
+    return tokens
+
+
+def _variable_key(text, pos):
+    """Return the YAML key or CSS property that the value at ``pos`` belongs to."""
+    match = VARIABLE_KEY_PATTERN.search(text, text.rfind("\n", 0, pos) + 1, pos)
+    return match.group(1) if match is not None else None
+
+
+def _compile_part(text, mode, tokens, blocks, literals, slots, block_slots, slot_keys):
+    """Append the segments and slots of one mode section.
+
+    ``blocks`` lists the (key, end, indent) of its card-mod block scalars,
+    with ``end`` relative to ``text``. A primary color found in a variable
+    of ``ROLE_BINDINGS`` becomes a slot of that role instead.
+    """
+    pattern = re.compile(
+        "|".join(re.escape(token) for token in sorted(tokens, key=len, reverse=True))
+    )
+    # (start, end, slot, block indent, variable key) of every slot, in text order
+    found = []
+    for match in pattern.finditer(text):
+        slot = tokens[match.group()]
+        key = _variable_key(text, match.start())
+        if slot == SLOT_PRIMARY and key in ROLE_BINDINGS:
+            slot = ROLE_BINDINGS[key]
+            if slot is None:
+                continue
+        found.append((match.start(), match.end(), slot, None, key))
+    for key, end, indent in blocks:
+        found.append((end, end, BLOCK_SLOTS[key], indent, key))
+    found.sort(key=lambda item: item[0])
+
+    pos = 0
+    for start, end, slot, indent, key in found:
+        literals[-1] += text[pos:start]
+        if indent is not None:
+            block_slots.append((len(slots), indent))
+        slots.append((mode, slot))
+        slot_keys.append(key)
+        literals.append("")
+        pos = end
+    literals[-1] += text[pos:]
+
+
+def compile_template(template, minify=False, anchors=False, index=None):
+    """Compile a theme template into a ``CompiledTemplate``.
+
+    The template is split at the boundaries found by ``index_template``:
+    everything before the dark mapping is the light mode, the rest is the
+    dark mode. The first top-level key, the theme name, becomes a slot of
+    its own, so one compiled template serves every config entry. Each
+    default value is matched once against the original text, so a
+    substituted value can never be replaced again by a later slot. The
+    default primary color becomes a primary, accent or info slot depending
+    on the variable holding it, see ``ROLE_BINDINGS``.
+    Card-mod blocks with backdrop filters get reduced-transparency fallbacks.
+    With ``minify``, the card-mod blocks are then minified. With
+    ``anchors``, repeated literal values become YAML aliases.
+    """
+    # Each step shifts the index along with its edits instead of parsing
+    # the template again.
+    index = index or index_template(template)
+    template, index = apply_edits(template, index, _fallback_edits(template, index))
+    original_size = len(template.encode("utf-8"))
+    if minify:
+        template, index = apply_edits(template, index, _minify_edits(template, index))
+
+    light_tokens = _mode_tokens(DEFAULT_LIGHT_RGB, DEFAULT_LIGHT_BG_URL)
+    dark_tokens = _mode_tokens(DEFAULT_DARK_RGB, DEFAULT_DARK_BG_URL)
+    if anchors:
+        tokens = list(light_tokens) + list(dark_tokens)
+
+        def has_slot(key, value):
+            return key in BLOCK_SLOTS or any(token in value for token in tokens)
+
+        edits = repeated_value_edits(template, (MODE_LIGHT, MODE_DARK), has_slot, index)
+        template, index = apply_edits(template, index, edits)
+
+    if index.name is None:
+        raise TemplateError("Theme name not found")
+    if MODE_LIGHT not in index.modes or MODE_DARK not in index.modes:
+        raise TemplateError("Light and dark modes not found")
+    name_start, name_end = index.name
+    boundary = index.modes[MODE_DARK][0]
+    if not name_end <= index.modes[MODE_LIGHT][0] < boundary:
+        raise TemplateError("Light mode must come before dark mode")
+
+    literals = [template[:name_start]]
+    slots = [(SCOPE_THEME, SLOT_THEME_NAME)]
+    slot_keys = [None]
+    block_slots = []
+    literals.append("")
+
+    # Each part compiles on its own text, so block offsets are made relative.
+    for mode, tokens, start, end in (
+        (MODE_LIGHT, light_tokens, name_end, boundary),
+        (MODE_DARK, dark_tokens, boundary, len(template)),
+    ):
+        blocks = [
+            (key, block_end - start, indent)
+            for key, block_mode, _, block_end, indent in index.blocks
+            if block_mode == mode and key in BLOCK_SLOTS
+        ]
+        _compile_part(
+            template[start:end], mode, tokens, blocks, literals, slots, block_slots, slot_keys
+        )
+    bytes_saved = original_size - len(template.encode("utf-8"))
+    return CompiledTemplate(literals, slots, block_slots, bytes_saved, slot_keys)
+
+
+def card_backdrop_filters(template, index=None):
+    """Return the card ``(blur px, saturation)`` of each mode of a template.
+
+    Values are read from the ``--ha-card-backdrop-filter`` declaration of
+    each mode; modes without one are left out.
+    """
+    index = index or index_template(template)
+    filters = {}
+    for mode in (MODE_LIGHT, MODE_DARK):
+        if mode not in index.modes:
+            continue
+        match = BACKDROP_FILTER_PATTERN.search(index.mode_text(template, mode))
+        if match is not None:
+            filters[mode] = (float(match.group(1)), float(match.group(2) or 1.0))
+    return filters
+
+
+def card_glass_tints(template, index=None):
+    """Return the ``--ha-card-glass-tint`` color of each mode of a template."""
+    index = index or index_template(template)
+    tints = {}
+    for mode in (MODE_LIGHT, MODE_DARK):
+        if mode not in index.modes:
+            continue
+        match = GLASS_TINT_PATTERN.search(index.mode_text(template, mode))
+        if match is not None:
+            tints[mode] = match.group(1).strip()
+    return tints
+
+
+_COMPILED = {}
+_COMPILED_LOCK = threading.Lock()
+
+
+def _template_path(filename):
+    return os.path.join(os.path.dirname(__file__), TEMPLATES_DIR, filename)
+
+
+def template_signature(filename):
+    """Return the (size, mtime_ns) of a template file, without reading it."""
+    stat = os.stat(_template_path(filename))
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_template(filename):
+    """Read a theme template shipped in the templates directory.
+
+    Templates ending in ``.gz`` are decompressed transparently.
+    """
+    path = _template_path(filename)
+    if filename.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            return f.read()
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def get_template_index(filename, template=None):
+    """Return the ``TemplateIndex`` of a template file, cached per file version.
+
+    ``template`` is the text of the file, if already loaded.
+    """
+    key = (filename, "index", template_signature(filename))
+    index = _COMPILED.get(key)
+    if index is None:
+        if template is None:
+            template = load_template(filename)
+        index = _COMPILED[key] = index_template(template)
+    return index
+
+
+def get_compiled_template(filename, minify=False, anchors=False):
+    """Return the compiled form of a template file, loading it on first use.
+
+    Only the compiled segments are cached; the raw template text is dropped
+    as soon as it has been compiled. Each combination of ``minify`` and
+    ``anchors`` is cached separately.
+    """
+    key = (filename, minify, anchors)
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        with _COMPILED_LOCK:
+            compiled = _COMPILED.get(key)
+            if compiled is None:
+                template = load_template(filename)
+                compiled = _COMPILED[key] = compile_template(
+                    template, minify, anchors, get_template_index(filename, template)
+                )
+    return compiled
+
+
+def get_compiled_theme(filename, minify=False):
+    """Return the ``CompiledTheme`` of a template file, compiling it on first use."""
+    key = (filename, minify, "theme")
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        template = get_compiled_template(filename, minify)
+        with _COMPILED_LOCK:
+            compiled = _COMPILED.get(key)
+            if compiled is None:
+                compiled = _COMPILED[key] = compile_theme(template)
+    return compiled
+
+
+def release_templates():
+    """Drop all cached templates; they are reloaded on the next render."""
+    with _COMPILED_LOCK:
+        _COMPILED.clear()
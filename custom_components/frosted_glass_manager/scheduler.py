@@ -0,0 +1,89 @@
+"""Latest-wins render scheduler for the Frosted Glass Theme Manager."""
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RenderScheduler:
+    """Serialize the theme renders of one config entry.
+
+    Every request bumps a generation counter. At most one render runs in the
+    executor at a time; requests arriving meanwhile collapse into a single
+    pending rerun, and the running render is told it has been superseded so
+    it can stop before touching disk. Other jobs writing the same files run
+    through ``async_run_exclusive`` so they never overlap a render.
+    """
+
+    def __init__(self, hass: HomeAssistant, render):
+        """Initialize the scheduler.
+
+        ``render`` is a blocking callable taking an ``is_current`` callback
+        and returning the list of files it changed and its result.
+        """
+        self._hass = hass
+        self._render = render
+        self._generation = 0
+        self._task = None
+        self._changed = []
+        self._result = None
+        self._lock = asyncio.Lock()
+        self.renders = 0
+        self.superseded = 0
+
+    @property
+    def generation(self):
+        """Return the generation of the most recent request."""
+        return self._generation
+
+    async def async_render(self):
+        """Request a render and wait until the latest generation is done.
+
+        Returns the names of all files changed since the newest caller last
+        collected them, and the result of the latest render. Requests that
+        were superseded get an empty list, so only the newest caller acts
+        on the changes.
+        """
+        self._generation += 1
+        generation = self._generation
+        if self._task is None:
+            self._task = self._hass.async_create_task(self._async_run())
+        await asyncio.shield(self._task)
+        if generation != self._generation:
+            return [], self._result
+        changed, self._changed = self._changed, []
+        return changed, self._result
+
+    async def async_run_exclusive(self, job, *args):
+        """Run the blocking ``job`` in the executor while no render is running."""
+        async with self._lock:
+            return await self._hass.async_add_executor_job(job, *args)
+
+    async def _async_run(self):
+        """Render until no newer request arrived during the last render."""
+        try:
+            while True:
+                generation = self._generation
+
+                def is_current(generation=generation):
+                    return generation == self._generation
+
+                self.renders += 1
+                async with self._lock:
+                    changed, self._result = await self._hass.async_add_executor_job(
+                        self._render, is_current
+                    )
+                for filename in changed:
+                    if filename not in self._changed:
+                        self._changed.append(filename)
+
+                if is_current():
+                    return
+                self.superseded += 1
+                _LOGGER.debug(
+                    f"Frosted Glass render {generation} superseded by {self._generation}"
+                )
+        finally:
+            self._task = None
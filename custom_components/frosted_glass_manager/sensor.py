@@ -0,0 +1,89 @@
+"""Diagnostic sensor for the Frosted Glass Theme Manager."""
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import (
+    DOMAIN,
+    DATA_STATS,
+    DATA_SCHEDULER,
+    STAT_RENDER_MS,
+    STAT_BYTES_WRITTEN,
+    STAT_LAST_REGENERATION,
+    SIGNAL_STATS_UPDATED,
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the diagnostic sensor from a config entry."""
+    async_add_entities([FrostedGlassRenderSensor(hass, entry)])
+
+
+class FrostedGlassRenderSensor(SensorEntity):
+    """Duration of the last theme render, with per-stage details as attributes."""
+
+    _attr_has_entity_name = True
+    _attr_name = "Last render duration"
+    _attr_icon = "mdi:timer-outline"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_should_poll = False
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+        """Initialize the sensor."""
+        self._entry = entry
+        self._data = hass.data[DOMAIN][entry.entry_id]
+        self._attr_unique_id = f"{entry.entry_id}_render_duration"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            manufacturer="Frosted Glass",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to render statistics updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_STATS_UPDATED.format(self._entry.entry_id),
+                self._async_stats_updated,
+            )
+        )
+
+    @callback
+    def _async_stats_updated(self) -> None:
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        """Return the duration of the last render in milliseconds."""
+        return self._data[DATA_STATS][STAT_RENDER_MS]
+
+    @property
+    def extra_state_attributes(self):
+        """Return the per-stage timings and write counters."""
+        stats = self._data[DATA_STATS]
+        scheduler = self._data[DATA_SCHEDULER]
+        attributes = {
+            key: value for key, value in stats.items() if key != STAT_RENDER_MS
+        }
+        attributes[STAT_BYTES_WRITTEN] = dict(stats[STAT_BYTES_WRITTEN])
+        last = stats[STAT_LAST_REGENERATION]
+        attributes[STAT_LAST_REGENERATION] = last.isoformat() if last else None
+        attributes["renders"] = scheduler.renders
+        attributes["renders_superseded"] = scheduler.superseded
+        return attributes
@@ -0,0 +1,359 @@
+"""Services of the Frosted Glass Theme Manager."""
+import logging
+import os
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.yaml import load_yaml
+
+from .analyzer import (
+    VARIANT_FULL,
+    VARIANT_LITE,
+    analyze_themes,
+    budget_violations,
+    compare_variants,
+)
+from . import (
+    async_rollback,
+    entry_theme_name,
+    is_foreign_theme_file,
+    theme_filename,
+    theme_filenames,
+    theme_names,
+)
+from .const import (
+    DOMAIN,
+    CONF_LIGHT_PRIMARY,
+    CONF_LIGHT_BG,
+    CONF_DARK_PRIMARY,
+    CONF_DARK_BG,
+    CONF_LIGHT_ACCENT,
+    CONF_DARK_ACCENT,
+    DEFAULT_LIGHT_BG_URL,
+    DEFAULT_DARK_BG_URL,
+    GENERATED_HEADER,
+    DATA_THEMES,
+    THEME_TEMPLATE_FILE,
+    LITE_THEME_TEMPLATE_FILE,
+    SERVICE_ANALYZE_PAYLOAD,
+    SERVICE_GENERATE_BATCH,
+    SERVICE_ROLLBACK,
+    ATTR_TOP,
+    ATTR_MAX_THEME_BYTES,
+    ATTR_MAX_VARIABLE_BYTES,
+    ATTR_THEMES,
+    ATTR_NAME,
+    ATTR_THEME,
+    ATTR_STEPS,
+    ATTR_DEFAULTS,
+    HISTORY_MAX_ITEMS,
+    DEFAULT_TOP,
+)
+from .palette import generate_hex_palettes
+from .renderer import (
+    MODE_LIGHT,
+    MODE_DARK,
+    TemplateError,
+    get_compiled_template,
+    render_values,
+)
+from .writer import write_segments_if_changed
+
+_LOGGER = logging.getLogger(__name__)
+
+ANALYZE_PAYLOAD_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_TOP, default=DEFAULT_TOP): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_MAX_THEME_BYTES): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(ATTR_MAX_VARIABLE_BYTES): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+
+
+def _rgb_string(value):
+    """Validate an RGB color given as ``[r, g, b]`` or ``"r, g, b"``."""
+    parts = value.split(",") if isinstance(value, str) else value
+    try:
+        rgb = [int(part) for part in parts]
+    except (TypeError, ValueError) as e:
+        raise vol.Invalid(f"invalid RGB color: {value}") from e
+    if len(rgb) != 3 or not all(0 <= channel <= 255 for channel in rgb):
+        raise vol.Invalid(f"invalid RGB color: {value}")
+    return ", ".join(str(channel) for channel in rgb)
+
+
+def _theme_spec(spec):
+    """Fill in the optional fields of a batch theme spec."""
+    spec = dict(spec)
+    spec[ATTR_NAME] = " ".join(spec[ATTR_NAME].split())
+    if not spec[ATTR_NAME]:
+        raise vol.Invalid("theme name must not be empty")
+    spec.setdefault(CONF_DARK_PRIMARY, spec[CONF_LIGHT_PRIMARY])
+    return spec
+
+
+GENERATE_BATCH_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_THEMES): vol.All(
+            [
+                vol.All(
+                    {
+                        vol.Required(ATTR_NAME): str,
+                        vol.Required(CONF_LIGHT_PRIMARY): _rgb_string,
+                        vol.Optional(CONF_DARK_PRIMARY): _rgb_string,
+                        vol.Optional(CONF_LIGHT_BG, default=DEFAULT_LIGHT_BG_URL): str,
+                        vol.Optional(CONF_DARK_BG, default=DEFAULT_DARK_BG_URL): str,
+                        vol.Optional(CONF_LIGHT_ACCENT): _rgb_string,
+                        vol.Optional(CONF_DARK_ACCENT): _rgb_string,
+                    },
+                    _theme_spec,
+                )
+            ],
+            vol.Length(min=1),
+        ),
+    }
+)
+
+ROLLBACK_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_THEME): str,
+        vol.Optional(ATTR_STEPS, default=1): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=HISTORY_MAX_ITEMS)
+        ),
+        vol.Optional(ATTR_DEFAULTS, default=False): bool,
+    }
+)
+
+
+def _analyze_files(hass: HomeAssistant, files, top):
+    """Load the generated theme files and analyze them (blocking).
+
+    ``files`` lists the (variant, filename, themes) of every file to
+    analyze; ``themes``, if not None, are the in-memory themes analyzed
+    instead of the file.
+    """
+    reports = {}
+    sizes = {}
+    by_variant = {VARIANT_FULL: [], VARIANT_LITE: []}
+    for variant, filename, themes in files:
+        if themes is None:
+            path = hass.config.path("themes", filename)
+            if not os.path.isfile(path):
+                raise HomeAssistantError(f"Theme file {filename} has not been generated yet")
+            themes = load_yaml(path) or {}
+        else:
+            filename = None
+        file_reports, file_sizes = analyze_themes(themes, variant, top)
+        for report in file_reports.values():
+            report["file"] = filename
+        reports.update(file_reports)
+        sizes.update(file_sizes)
+        by_variant[variant].extend(file_reports)
+    return reports, sizes, by_variant
+
+
+async def _async_analyze_payload(hass: HomeAssistant, call: ServiceCall):
+    """Report the serialized size of the generated themes and check the budget.
+
+    The themes of every loaded config entry are analyzed, from memory for
+    entries whose themes are applied directly.
+    """
+    files = []
+    for entry_id, data in hass.data.get(DOMAIN, {}).items():
+        entry = hass.config_entries.async_get_entry(entry_id)
+        if entry is None:
+            continue
+        name = entry_theme_name(entry)
+        for variant, theme_name, filename in zip(
+            (VARIANT_FULL, VARIANT_LITE), theme_names(name), theme_filenames(name)
+        ):
+            theme = data[DATA_THEMES].get(theme_name)
+            files.append((variant, filename, None if theme is None else {theme_name: theme}))
+    reports, sizes, by_variant = await hass.async_add_executor_job(
+        _analyze_files, hass, files, call.data[ATTR_TOP]
+    )
+
+    lite_vs_full = {
+        lite: compare_variants(reports[full], reports[lite])
+        for full, lite in zip(by_variant[VARIANT_FULL], by_variant[VARIANT_LITE])
+    }
+    max_theme_bytes = call.data.get(ATTR_MAX_THEME_BYTES)
+    max_variable_bytes = call.data.get(ATTR_MAX_VARIABLE_BYTES)
+    violations = budget_violations(reports, sizes, max_theme_bytes, max_variable_bytes)
+    if violations:
+        for violation in violations:
+            _LOGGER.warning(f"Frosted Glass Manager: {violation}")
+        raise HomeAssistantError(
+            f"Frosted Glass themes exceed the payload budget: {'; '.join(violations)}"
+        )
+
+    return {"themes": reports, "lite_vs_full": lite_vs_full}
+
+
+def _generate_batch(hass: HomeAssistant, specs):
+    """Render and write the Full and Lite themes of every spec (blocking).
+
+    The palettes of all specs are computed in one batch, and every theme
+    renders from the shared compiled templates. Existing theme files not
+    written by the integration are refused before anything is written.
+    Returns the names of the files written and of those whose content
+    changed.
+    """
+    foreign = [
+        filename
+        for spec in specs
+        for filename in theme_filenames(spec[ATTR_NAME])
+        if is_foreign_theme_file(hass, filename)
+    ]
+    if foreign:
+        raise HomeAssistantError(
+            "Theme files not created by Frosted Glass Manager already exist: "
+            + ", ".join(foreign)
+        )
+
+    colors = []
+    for spec in specs:
+        colors += [spec[CONF_LIGHT_PRIMARY], spec[CONF_DARK_PRIMARY]]
+    palettes = iter(generate_hex_palettes(colors))
+    templates = (
+        get_compiled_template(THEME_TEMPLATE_FILE),
+        get_compiled_template(LITE_THEME_TEMPLATE_FILE),
+    )
+    themes_dir = hass.config.path("themes")
+    os.makedirs(themes_dir, exist_ok=True)
+
+    files = []
+    changed = []
+    for spec in specs:
+        inputs = {
+            MODE_LIGHT: (spec[CONF_LIGHT_PRIMARY], spec[CONF_LIGHT_BG], next(palettes)),
+            MODE_DARK: (spec[CONF_DARK_PRIMARY], spec[CONF_DARK_BG], next(palettes)),
+        }
+        accents = {
+            MODE_LIGHT: spec.get(CONF_LIGHT_ACCENT),
+            MODE_DARK: spec.get(CONF_DARK_ACCENT),
+        }
+        for compiled, name in zip(templates, theme_names(spec[ATTR_NAME])):
+            filename = theme_filename(name)
+            segments = [
+                GENERATED_HEADER,
+                *compiled.segments(render_values(name, inputs, accents=accents)),
+            ]
+            files.append(filename)
+            if write_segments_if_changed(os.path.join(themes_dir, filename), segments):
+                changed.append(filename)
+    return files, changed
+
+
+async def _async_generate_batch(hass: HomeAssistant, call: ServiceCall):
+    """Generate a theme pair per spec and reload the themes once."""
+    specs = call.data[ATTR_THEMES]
+
+    # Files of config entries are regenerated from their options, so a batch
+    # theme of the same name would be overwritten; reject those up front.
+    used = {
+        filename.casefold()
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        for filename in theme_filenames(entry_theme_name(entry))
+    }
+    for spec in specs:
+        for filename in theme_filenames(spec[ATTR_NAME]):
+            if filename.casefold() in used:
+                raise HomeAssistantError(
+                    f"Theme file {filename} is already used by another theme"
+                )
+            used.add(filename.casefold())
+
+    try:
+        files, changed = await hass.async_add_executor_job(_generate_batch, hass, specs)
+    except (OSError, TemplateError) as e:
+        raise HomeAssistantError(f"Could not generate the Frosted Glass themes: {e}") from e
+
+    if changed:
+        await hass.services.async_call("frontend", "reload_themes", {}, blocking=True)
+    _LOGGER.info(
+        f"Frosted Glass Manager: generated {len(files)} theme files, {len(changed)} changed"
+    )
+    return {"files": files, "changed": changed}
+
+
+def _loaded_entry(hass: HomeAssistant, theme):
+    """Return the loaded config entry of the theme called ``theme``.
+
+    Without a name, the only loaded entry is returned.
+    """
+    entries = []
+    for entry_id in hass.data.get(DOMAIN, {}):
+        entry = hass.config_entries.async_get_entry(entry_id)
+        if entry is not None:
+            entries.append(entry)
+    if theme is None:
+        if len(entries) != 1:
+            raise HomeAssistantError("Several Frosted Glass themes are set up; name one")
+        return entries[0]
+    for entry in entries:
+        if entry_theme_name(entry) == theme:
+            return entry
+    raise HomeAssistantError(f"No Frosted Glass theme called {theme} is set up")
+
+
+async def _async_rollback(hass: HomeAssistant, call: ServiceCall):
+    """Restore an earlier theme set of one config entry from its history."""
+    entry = _loaded_entry(hass, call.data.get(ATTR_THEME))
+    item = await async_rollback(hass, entry, call.data[ATTR_STEPS], call.data[ATTR_DEFAULTS])
+    if item is None:
+        raise HomeAssistantError(
+            f"The history of {entry_theme_name(entry)} holds no such theme set"
+        )
+    return {"created": item["created"], "options": item["options"]}
+
+
+@callback
+def async_setup_services(hass: HomeAssistant):
+    """Register the integration services, once for all config entries."""
+    if hass.services.has_service(DOMAIN, SERVICE_ANALYZE_PAYLOAD):
+        return
+
+    async def analyze_payload(call: ServiceCall):
+        return await _async_analyze_payload(hass, call)
+
+    async def generate_batch(call: ServiceCall):
+        return await _async_generate_batch(hass, call)
+
+    async def rollback(call: ServiceCall):
+        return await _async_rollback(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ANALYZE_PAYLOAD,
+        analyze_payload,
+        schema=ANALYZE_PAYLOAD_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GENERATE_BATCH,
+        generate_batch,
+        schema=GENERATE_BATCH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ROLLBACK,
+        rollback,
+        schema=ROLLBACK_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+@callback
+def async_unload_services(hass: HomeAssistant):
+    """Remove the integration services once the last config entry is gone."""
+    hass.services.async_remove(DOMAIN, SERVICE_ANALYZE_PAYLOAD)
+    hass.services.async_remove(DOMAIN, SERVICE_GENERATE_BATCH)
+    hass.services.async_remove(DOMAIN, SERVICE_ROLLBACK)
@@ -0,0 +1,185 @@
+"""Structural index of a theme template: theme name, modes, keys and blocks."""
+import re
+from bisect import bisect_right
+
+# A mapping key: plain, or quoted as the theme name may be
+KEY_PATTERN = re.compile(
+    r"( *)(\"(?:[^\"\\\n]|\\.)*\"|'(?:[^'\n]|'')*'|[^\s#'\"][^\n]*?):(?=[ \t]|$)(.*)$"
+)
+BLOCK_INDICATOR_PATTERN = re.compile(r"[ \t]*(?:[&!]\S+[ \t]+)*[|>][-+0-9]*[ \t]*(?:#.*)?$")
+
+
+class TemplateIndex:
+    """Offsets of the structural parts of one template text.
+
+    ``name`` is the (start, end) of the theme name key. ``modes`` maps each
+    mode to the (start, end) of its mapping, from its header line to just
+    past its last non-blank line, in template order. ``entries`` maps each
+    mode to its variables as ``(key, start, value_start, end)``: the
+    offsets of the key line, of the text after ``key:`` and just past the
+    last non-blank line of the value. ``blocks`` lists the block scalars
+    as ``(key, mode, start, end, indent)``: the content from the line after
+    the key to just past its last non-blank line, and the indent of that
+    content. Lines inside block scalars are never read as keys.
+
+    Functions working on a template text take an optional ``index``, the
+    ``TemplateIndex`` of that text if already known; without it the text
+    is indexed again.
+    """
+
+    __slots__ = ("name", "modes", "entries", "blocks")
+
+    def __init__(self, name, modes, entries, blocks):
+        """Initialize the index."""
+        self.name = name
+        self.modes = modes
+        self.entries = entries
+        self.blocks = blocks
+
+    def block_ranges(self, keys):
+        """Return the (start, end, indent) of the blocks of ``keys``, in text order."""
+        return [
+            (start, end, indent)
+            for key, _, start, end, indent in self.blocks
+            if key in keys
+        ]
+
+    def mode_text(self, text, mode):
+        """Return the part of ``text`` holding the mapping of ``mode``."""
+        start, end = self.modes[mode]
+        return text[start:end]
+
+
+def index_template(text):
+    """Parse a theme template into a ``TemplateIndex`` in one pass.
+
+    The template is a single theme: its first top-level key is the theme
+    name, and the ``modes`` mapping below it holds one mapping per mode.
+    """
+    name = None
+    modes = {}
+    entries = {}
+    blocks = []
+    # (indent, key) of the mapping keys enclosing the current line
+    stack = []
+    # [key, mode, start, end, key indent, content indent] of an open block
+    block = None
+    # [key, start, value_start, end, indent] of the current mode entry
+    entry = None
+    mode = None
+    name_key = None
+
+    pos = 0
+    length = len(text)
+    while pos < length:
+        newline = text.find("\n", pos)
+        line_end = length if newline == -1 else newline + 1
+        line = text[pos:line_end].rstrip("\r\n")
+        stripped = line.strip()
+        indent = len(line) - len(line.lstrip(" "))
+        line_start = pos
+        pos = line_end
+        if not stripped:
+            continue
+
+        if block is not None:
+            if indent > block[4]:
+                if block[5] is None:
+                    block[5] = indent
+                block[3] = line_end
+                if entry is not None:
+                    entry[3] = line_end
+                continue
+            if block[5] is not None:
+                blocks.append((block[0], block[1], block[2], block[3], " " * block[5]))
+            block = None
+
+        if stripped.startswith("#"):
+            if entry is not None and indent > entry[4]:
+                entry[3] = line_end
+            continue
+
+        match = KEY_PATTERN.match(line)
+        if match is None:
+            # Continuation of a multi-line value or a list item
+            if entry is not None and indent > entry[4]:
+                entry[3] = line_end
+            continue
+
+        key = match.group(2)
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        if entry is not None and indent <= entry[4]:
+            entries[mode].append(tuple(entry[:4]))
+            modes[mode] = (modes[mode][0], entry[3])
+            entry = None
+        if mode is not None and len(stack) < 3:
+            mode = None
+
+        path = [parent for _, parent in stack]
+        if not stack and name is None:
+            name = (line_start + indent, line_start + indent + len(key))
+            name_key = key
+        elif path == [name_key, "modes"]:
+            mode = key
+            modes[mode] = (line_start, line_end)
+            entries[mode] = []
+        elif mode is not None and len(path) == 3:
+            value_start = line_start + indent + len(key) + 1
+            entry = [key, line_start, value_start, line_end, indent]
+        elif entry is not None:
+            entry[3] = line_end
+
+        if BLOCK_INDICATOR_PATTERN.match(match.group(3)):
+            block = [key, mode, line_end, line_end, indent, None]
+        stack.append((indent, key))
+
+    if block is not None and block[5] is not None:
+        blocks.append((block[0], block[1], block[2], block[3], " " * block[5]))
+    if entry is not None:
+        entries[mode].append(tuple(entry[:4]))
+        modes[mode] = (modes[mode][0], entry[3])
+    return TemplateIndex(name, modes, entries, blocks)
+
+
+def apply_edits(text, index, edits):
+    """Apply ``edits`` to ``text``; return the new text and its ``TemplateIndex``.
+
+    ``edits`` lists non-overlapping ``(start, end, replacement)`` in text
+    order. The index is shifted instead of rebuilt, so edits must leave the
+    structure alone: they may only replace or extend block and value text.
+    An offset at the end of an edit moves with it, so blocks and values
+    ending there grow to include an insertion.
+    """
+    parts = []
+    pos = 0
+    ends = []
+    shifts = []
+    delta = 0
+    for start, end, replacement in edits:
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+        delta += len(replacement) - (end - start)
+        ends.append(end)
+        shifts.append(delta)
+    parts.append(text[pos:])
+
+    def shift(offset):
+        count = bisect_right(ends, offset)
+        return offset + shifts[count - 1] if count else offset
+
+    name = None if index.name is None else tuple(shift(offset) for offset in index.name)
+    modes = {mode: (shift(start), shift(end)) for mode, (start, end) in index.modes.items()}
+    entries = {
+        mode: [
+            (key, shift(start), shift(value_start), shift(end))
+            for key, start, value_start, end in mode_entries
+        ]
+        for mode, mode_entries in index.entries.items()
+    }
+    blocks = [
+        (key, mode, shift(start), shift(end), indent)
+        for key, mode, start, end, indent in index.blocks
+    ]
+    return "".join(parts), TemplateIndex(name, modes, entries, blocks)
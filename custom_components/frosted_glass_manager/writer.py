@@ -0,0 +1,108 @@
+"""Content-addressed, atomic theme file writer."""
+import hashlib
+import os
+import tempfile
+
+# file path -> (sha256 digest, size, mtime_ns) of the last content seen on disk
+_DIGESTS = {}
+
+
+def content_digest(data):
+    """Return the SHA-256 hex digest of ``data`` (bytes)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def segments_digest(segments):
+    """Return the SHA-256 hex digest of the UTF-8 concatenation of ``segments``.
+
+    The digest is updated one segment at a time, so the whole content is
+    never encoded at once.
+    """
+    digest = hashlib.sha256()
+    for segment in segments:
+        digest.update(segment.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _file_digest(file_path):
+    """Return the digest of the file on disk, or None if it cannot be read."""
+    try:
+        with open(file_path, "rb") as f:
+            return content_digest(f.read())
+    except OSError:
+        return None
+
+
+def _remember(file_path, digest):
+    stat = os.stat(file_path)
+    _DIGESTS[file_path] = (digest, stat.st_size, stat.st_mtime_ns)
+
+
+def known_digest(file_path):
+    """Return the digest of the content last written or verified at ``file_path``."""
+    cached = _DIGESTS.get(file_path)
+    return cached[0] if cached is not None else None
+
+
+def is_current(file_path, digest):
+    """Return True if the file on disk already holds content with ``digest``.
+
+    The stored digest is trusted as long as size and mtime are unchanged;
+    otherwise the file is hashed again, which also catches manual edits.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+
+    cached = _DIGESTS.get(file_path)
+    if cached is not None and cached[1:] == (stat.st_size, stat.st_mtime_ns):
+        return cached[0] == digest
+
+    on_disk = _file_digest(file_path)
+    if on_disk is None:
+        return False
+    _DIGESTS[file_path] = (on_disk, stat.st_size, stat.st_mtime_ns)
+    return on_disk == digest
+
+
+def write_if_changed(file_path, content):
+    """Write ``content`` to ``file_path`` unless the file already holds it.
+
+    Returns True if the file was written, see ``write_segments_if_changed``.
+    """
+    return write_segments_if_changed(file_path, (content,))
+
+
+def write_segments_if_changed(file_path, segments):
+    """Write ``segments``, joined, to ``file_path`` unless the file already holds them.
+
+    ``segments`` is a sequence of strings, read twice: once to hash the
+    content and, only if it changed, once to stream it to disk, so the
+    content is never held as one string. The file is replaced atomically
+    through a temporary file in the same directory plus rename, so readers
+    never see a partial theme.
+    Returns True if the file was written.
+    """
+    digest = segments_digest(segments)
+    if is_current(file_path, digest):
+        return False
+
+    directory = os.path.dirname(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.writelines(segments)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    _remember(file_path, digest)
+    return True
@@ -0,0 +1,36 @@
+"""Run the integration against the Home Assistant stand-ins of the benchmarks."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+
+from stubs import ROOT, FakeConfigEntry, FakeHomeAssistant, install_homeassistant_stubs  # noqa: E402
+
+install_homeassistant_stubs()
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def hass(tmp_path):
+    """Return a stand-in ``hass`` whose config directory is ``tmp_path``."""
+    return FakeHomeAssistant(str(tmp_path))
+
+
+@pytest.fixture
+def setup_entry(hass):
+    """Return a coroutine function setting up a config entry with ``options``."""
+    import custom_components.frosted_glass_manager as integration
+    from custom_components.frosted_glass_manager import renderer, writer
+
+    renderer.release_templates()
+    writer._DIGESTS.clear()
+
+    async def setup(options=None, entry_id="entry", data=None):
+        entry = FakeConfigEntry(options, entry_id, data)
+        hass.config_entries.entries.append(entry)
+        assert await integration.async_setup_entry(hass, entry)
+        return entry
+
+    return setup
@@ -0,0 +1,41 @@
+"""Tests that YAML anchors do not change the loaded themes."""
+import pytest
+import yaml
+
+from custom_components.frosted_glass_manager import const, palette, renderer
+
+OPTIONS = [
+    ("106, 116, 211", "https://example.com/light.jpg", "106, 116, 211", "/local/dark.jpg"),
+    ("220, 90, 40", "/local/light.jpg", "40, 160, 120", "/local/dark.jpg"),
+]
+
+
+def _values(light_primary, light_bg, dark_primary, dark_bg):
+    return renderer.render_values(
+        const.DEFAULT_THEME_NAME,
+        {
+            renderer.MODE_LIGHT: (
+                light_primary, light_bg, palette.generate_hex_palette(light_primary)
+            ),
+            renderer.MODE_DARK: (
+                dark_primary, dark_bg, palette.generate_hex_palette(dark_primary)
+            ),
+        },
+        {renderer.MODE_DARK: ".extra { color: red; }"},
+    )
+
+
+@pytest.mark.parametrize(
+    "filename", [const.THEME_TEMPLATE_FILE, const.LITE_THEME_TEMPLATE_FILE]
+)
+@pytest.mark.parametrize("minify", [False, True])
+@pytest.mark.parametrize("inputs", OPTIONS)
+def test_anchors_load_to_the_same_theme(filename, minify, inputs):
+    template = renderer.load_template(filename)
+    values = _values(*inputs)
+    plain = renderer.compile_template(template, minify).render(values)
+    aliased = renderer.compile_template(template, minify, anchors=True).render(values)
+
+    assert "*v1" in aliased
+    assert len(aliased) < len(plain)
+    assert yaml.safe_load(aliased) == yaml.safe_load(plain)
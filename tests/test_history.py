@@ -0,0 +1,128 @@
+"""Tests for the theme history and rolling back to it."""
+import asyncio
+import os
+import time
+
+import yaml
+
+import custom_components.frosted_glass_manager as integration
+from custom_components.frosted_glass_manager import const
+from custom_components.frosted_glass_manager.history import ThemeHistory
+from custom_components.frosted_glass_manager.writer import known_digest
+
+FILE = f"{const.DEFAULT_THEME_NAME}.yaml"
+FIRST = {const.CONF_LIGHT_PRIMARY: [10, 20, 30], const.CONF_DEBOUNCE_MS: 250}
+SECOND = {**FIRST, const.CONF_LIGHT_PRIMARY: [200, 100, 50]}
+THIRD = {**FIRST, const.CONF_LIGHT_PRIMARY: [0, 150, 0]}
+
+
+def _write(path, content):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _read(hass, filename=FILE):
+    with open(hass.config.path("themes", filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def _light_primary(hass):
+    theme = yaml.safe_load(_read(hass))[const.DEFAULT_THEME_NAME]
+    return theme["modes"]["light"]["primary-color"]
+
+
+async def _regenerate(hass, entry, options):
+    entry.options = options
+    await integration._async_regenerate(hass, entry)
+
+
+def test_history_evicts_the_oldest_unpinned_items(tmp_path):
+    source = tmp_path / "theme.yaml"
+    history = ThemeHistory(str(tmp_path / "history"), 3, 1 << 20)
+    for number in range(5):
+        _write(source, f"theme: {number}\n")
+        history.record(f"fp{number}", {"theme.yaml": str(source)}, {"n": number}, number == 0)
+
+    items = ThemeHistory(str(tmp_path / "history"), 3, 1 << 20).items()
+    assert [item["fingerprint"] for item in items] == ["fp4", "fp3", "fp0"]
+    assert items[-1]["pinned"]
+    assert sorted(os.listdir(tmp_path / "history")) == ["fp0", "fp3", "fp4", "history.json"]
+
+
+def test_history_restores_the_recorded_files(tmp_path):
+    source = tmp_path / "themes" / "theme.yaml"
+    source.parent.mkdir()
+    history = ThemeHistory(str(tmp_path / "history"), 3, 1 << 20)
+    _write(source, "theme: old\n")
+    history.record("old", {"theme.yaml": str(source)}, {})
+    _write(source, "theme: new\n")
+    history.record("new", {"theme.yaml": str(source)}, {})
+
+    digests = history.restore("old", str(tmp_path / "themes"))
+
+    assert source.read_text(encoding="utf-8") == "theme: old\n"
+    assert digests == {"theme.yaml": known_digest(str(source))}
+    assert [item["fingerprint"] for item in history.items()] == ["old", "new"]
+
+
+def test_rollback_restores_files_and_options_without_rendering(hass, setup_entry):
+    async def run():
+        entry = await setup_entry(FIRST)
+        first = _read(hass)
+        await _regenerate(hass, entry, SECOND)
+        scheduler = hass.data[const.DOMAIN][entry.entry_id][const.DATA_SCHEDULER]
+        renders = scheduler.renders
+
+        item = await integration.async_rollback(hass, entry)
+        await asyncio.sleep(0.5)
+        return entry, item, first, scheduler.renders - renders
+
+    entry, item, first, renders = asyncio.run(run())
+    assert item["options"] == FIRST
+    assert entry.options == FIRST
+    assert _read(hass) == first
+    assert renders == 0
+    assert ("frontend", "reload_themes") in hass.services.calls
+
+
+def test_rollback_to_defaults_without_a_pinned_render_resets_the_options(hass, setup_entry):
+    async def run():
+        entry = await setup_entry(FIRST)
+        item = await integration.async_rollback(hass, entry, defaults=True)
+        await asyncio.sleep(0.5)
+        history = hass.data[const.DOMAIN][entry.entry_id][const.DATA_HISTORY]
+        return entry, item, await hass.async_add_executor_job(history.items)
+
+    entry, item, items = asyncio.run(run())
+    assert item["created"] is None
+    assert integration.resolve_theme_inputs(entry.options) == integration.resolve_theme_inputs({})
+    assert items[0]["pinned"]
+    assert _light_primary(hass) == f"rgb({const.DEFAULT_LIGHT_RGB})"
+
+
+def test_rollback_waits_for_a_render_in_flight(hass, setup_entry, monkeypatch):
+    async def run():
+        entry = await setup_entry(FIRST)
+        await _regenerate(hass, entry, SECOND)
+
+        write = integration.write_segments_if_changed
+        started = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def slow_write(path, segments):
+            loop.call_soon_threadsafe(started.set)
+            time.sleep(0.3)
+            return write(path, segments)
+
+        monkeypatch.setattr(integration, "write_segments_if_changed", slow_write)
+        render = hass.async_create_task(_regenerate(hass, entry, THIRD))
+        await started.wait()
+        item = await integration.async_rollback(hass, entry)
+        await render
+        await asyncio.sleep(0.5)
+        return entry, item
+
+    entry, item = asyncio.run(run())
+    assert item["options"] == FIRST
+    assert entry.options == FIRST
+    assert _light_primary(hass) == "rgb(10, 20, 30)"
@@ -0,0 +1,92 @@
+"""Tests for the background mirror against a local HTTP server."""
+import asyncio
+import hashlib
+import os
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from stubs import FakeHomeAssistant
+
+from custom_components.frosted_glass_manager import mirror
+
+# Several times aiohttp's read buffer, sent in pieces
+IMAGE = bytes(range(256)) * 11719 + b"end"
+CHUNK = 65536
+ETAG = '"v1"'
+
+
+def _app(requests, sized):
+    async def image(request):
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == ETAG:
+            return web.Response(status=304)
+        response = web.StreamResponse(headers={"ETag": ETAG, "Content-Type": "image/jpeg"})
+        if sized:
+            response.content_length = len(IMAGE)
+        await response.prepare(request)
+        for start in range(0, len(IMAGE), CHUNK):
+            await response.write(IMAGE[start:start + CHUNK])
+            await asyncio.sleep(0)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/bg.jpg", image)
+    return app
+
+
+async def _resolve_twice(directory, sized=True):
+    requests = []
+    server = TestServer(_app(requests, sized))
+    await server.start_server()
+    url = str(server.make_url("/bg.jpg"))
+    try:
+        async with aiohttp.ClientSession() as session:
+            bg_mirror = mirror.BackgroundMirror(
+                FakeHomeAssistant(directory), session, directory, "/local/bg"
+            )
+            first = await bg_mirror.async_resolve([url])
+            second = await bg_mirror.async_resolve([url])
+            path = bg_mirror.local_path(url)
+    finally:
+        await server.close()
+    return url, first, second, path, requests
+
+
+def test_mirror_stores_the_whole_multi_chunk_body(tmp_path):
+    url, first, second, path, requests = asyncio.run(_resolve_twice(str(tmp_path)))
+
+    with open(path, "rb") as f:
+        stored = f.read()
+    assert stored == IMAGE
+    assert os.path.basename(path) == hashlib.sha256(IMAGE).hexdigest()[:16] + ".jpg"
+    assert first == second == {url: f"/local/bg/{os.path.basename(path)}"}
+    assert requests == [None, ETAG]
+
+
+@pytest.mark.parametrize("sized", [True, False])
+def test_mirror_rejects_images_over_the_cap(tmp_path, monkeypatch, sized):
+    monkeypatch.setattr(mirror, "MAX_IMAGE_BYTES", len(IMAGE) - 1)
+    _, first, _, path, _ = asyncio.run(_resolve_twice(str(tmp_path), sized))
+
+    assert first == {}
+    assert path is None
+    assert os.listdir(tmp_path) in ([], ["mirror.json"])
+
+
+def test_mirror_resolves_cached_urls_without_fetching(tmp_path):
+    directory = str(tmp_path)
+    url, first, _, _, requests = asyncio.run(_resolve_twice(directory))
+
+    async def resolve_cached():
+        # Without a session any fetch would fail.
+        bg_mirror = mirror.BackgroundMirror(
+            FakeHomeAssistant(directory), None, directory, "/local/bg"
+        )
+        return await bg_mirror.async_resolve_cached([url, "/local/light.jpg"])
+
+    assert asyncio.run(resolve_cached()) == first
+    assert requests == [None, ETAG]
@@ -0,0 +1,20 @@
+"""Tests for the CSS built from the processed backgrounds."""
+from custom_components.frosted_glass_manager import const, renderer
+from custom_components.frosted_glass_manager.optimizer import blurred_card_css
+
+
+def test_blurred_card_css_layers_the_full_theme_tint_over_the_image():
+    template = renderer.load_template(const.THEME_TEMPLATE_FILE)
+    tints = renderer.card_glass_tints(template)
+
+    assert tints == {
+        renderer.MODE_LIGHT: "rgba(255, 255, 255, 0.08)",
+        renderer.MODE_DARK: "rgba(28, 29, 33, 0.18)",
+    }
+    css = blurred_card_css("/local/blurred.jpg", tints[renderer.MODE_DARK])
+    assert (
+        "background: linear-gradient(rgba(28, 29, 33, 0.18), rgba(28, 29, 33, 0.18)), "
+        "center / cover no-repeat url('/local/blurred.jpg');"
+    ) in css
+    assert "fixed" not in css
+    assert "linear-gradient" not in blurred_card_css("/local/blurred.jpg")
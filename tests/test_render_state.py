@@ -0,0 +1,53 @@
+"""Tests that the recorded render state matches the files on disk."""
+import asyncio
+import os
+import time
+
+import yaml
+
+import custom_components.frosted_glass_manager as integration
+from custom_components.frosted_glass_manager import const
+
+OLD = {const.CONF_LIGHT_PRIMARY: [10, 20, 30], const.CONF_DEBOUNCE_MS: 1000}
+NEW = {**OLD, const.CONF_LIGHT_PRIMARY: [200, 100, 50]}
+
+
+def _light_primary(hass):
+    path = hass.config.path("themes", f"{const.DEFAULT_THEME_NAME}.yaml")
+    with open(path, encoding="utf-8") as f:
+        theme = yaml.safe_load(f)[const.DEFAULT_THEME_NAME]
+    return theme["modes"]["light"]["primary-color"]
+
+
+def test_options_changed_during_a_slow_render_are_rendered(hass, setup_entry, monkeypatch):
+    async def run():
+        entry = await setup_entry(OLD)
+        assert _light_primary(hass) == "rgb(10, 20, 30)"
+
+        write = integration.write_segments_if_changed
+        started = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def slow_write(path, segments):
+            loop.call_soon_threadsafe(started.set)
+            time.sleep(0.2)
+            return write(path, segments)
+
+        monkeypatch.setattr(integration, "write_segments_if_changed", slow_write)
+        # Force a render of the old options, and change them while it writes
+        hass.data[const.DOMAIN][entry.entry_id][const.DATA_RENDER_STATE] = None
+        os.remove(hass.config.path("themes", f"{const.DEFAULT_THEME_NAME}.yaml"))
+        render = hass.async_create_task(integration._async_regenerate(hass, entry))
+        await started.wait()
+        hass.config_entries.async_update_entry(entry, options=NEW)
+        await render
+        # The debounced render of the new options starts once this one is done
+        await asyncio.sleep(1.5)
+        return entry
+
+    entry = asyncio.run(run())
+    assert _light_primary(hass) == "rgb(200, 100, 50)"
+
+    data = hass.data[const.DOMAIN][entry.entry_id]
+    fingerprint = integration._render_fingerprint(entry, data, dict(entry.options))
+    assert data[const.DATA_RENDER_STATE]["fingerprint"] == fingerprint
@@ -0,0 +1,61 @@
+"""Tests for rendering templates one scope at a time."""
+from custom_components.frosted_glass_manager import const, renderer
+from custom_components.frosted_glass_manager.palette import generate_hex_palette
+
+NAME = "Frosted Glass Custom"
+INPUTS = {
+    renderer.MODE_LIGHT: ("#4070c0", "url('/local/light.jpg')"),
+    renderer.MODE_DARK: ("#203050", "url('/local/dark.jpg')"),
+}
+
+
+def _render(compiled, inputs, fragments, built):
+    fingerprints = {renderer.SCOPE_THEME: NAME, **inputs}
+
+    def build_values(scope):
+        built.append(scope)
+        if scope == renderer.SCOPE_THEME:
+            return renderer.theme_values(NAME)
+        primary, background = inputs[scope]
+        return renderer.mode_values(primary, background, generate_hex_palette(primary))
+
+    parts, rendered = renderer.render_incremental(compiled, fingerprints, build_values, fragments)
+    full = compiled.render(
+        renderer.render_values(
+            NAME,
+            {
+                mode: (primary, background, generate_hex_palette(primary))
+                for mode, (primary, background) in inputs.items()
+            },
+        )
+    )
+    assert "".join(parts) == full
+    return parts, rendered
+
+
+def test_unchanged_scopes_reuse_their_fragments():
+    compiled = renderer.get_compiled_template(const.THEME_TEMPLATE_FILE)
+    fragments = {}
+    built = []
+
+    parts, rendered = _render(compiled, INPUTS, fragments, built)
+    assert sorted(rendered) == sorted(compiled.scopes) == sorted(built)
+
+    built.clear()
+    again, rendered = _render(compiled, INPUTS, fragments, built)
+    assert rendered == built == []
+    assert all(new is old for new, old in zip(again, parts))
+
+    changed = {**INPUTS, renderer.MODE_DARK: ("#c04070", INPUTS[renderer.MODE_DARK][1])}
+    _, rendered = _render(compiled, changed, fragments, built)
+    assert rendered == built == [renderer.MODE_DARK]
+
+
+def test_another_compiled_template_renders_every_scope_again():
+    fragments = {}
+    _render(renderer.get_compiled_template(const.THEME_TEMPLATE_FILE), INPUTS, fragments, [])
+
+    minified = renderer.get_compiled_template(const.THEME_TEMPLATE_FILE, minify=True)
+    built = []
+    _, rendered = _render(minified, INPUTS, fragments, built)
+    assert sorted(rendered) == sorted(minified.scopes) == sorted(built)
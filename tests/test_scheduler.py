@@ -0,0 +1,108 @@
+"""Tests for the latest-wins render scheduler."""
+import asyncio
+import threading
+
+from custom_components.frosted_glass_manager.scheduler import RenderScheduler
+
+
+class SlowRender:
+    """A render blocking until released, recording how many run at once."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, is_current):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.started.set()
+        self.release.wait(5)
+        with self._lock:
+            self.running -= 1
+        return [f"file{call}"], call
+
+
+async def _started(render):
+    await asyncio.get_running_loop().run_in_executor(None, render.started.wait, 5)
+
+
+def test_requests_during_a_render_collapse_into_one_rerun(hass):
+    render = SlowRender()
+    scheduler = RenderScheduler(hass, render)
+
+    async def run():
+        first = asyncio.ensure_future(scheduler.async_render())
+        await _started(render)
+        others = [asyncio.ensure_future(scheduler.async_render()) for _ in range(3)]
+        await asyncio.sleep(0)
+        render.release.set()
+        return await first, await asyncio.gather(*others)
+
+    first, others = asyncio.run(run())
+
+    assert render.calls == scheduler.renders == 2
+    assert scheduler.superseded == 1
+    assert render.max_running == 1
+    # Only the newest caller collects the changes, those of both renders.
+    assert first == ([], 2)
+    assert others[:2] == [([], 2), ([], 2)]
+    assert others[2] == (["file1", "file2"], 2)
+
+
+def test_exclusive_jobs_wait_for_the_render_in_flight(hass):
+    render = SlowRender()
+    scheduler = RenderScheduler(hass, render)
+    order = []
+
+    def job():
+        order.append(("job", render.running))
+        return "done"
+
+    async def run():
+        rendering = asyncio.ensure_future(scheduler.async_render())
+        await _started(render)
+        exclusive = asyncio.ensure_future(scheduler.async_run_exclusive(job))
+        await asyncio.sleep(0.05)
+        assert not exclusive.done()
+        render.release.set()
+        return await rendering, await exclusive
+
+    assert asyncio.run(run()) == ((["file1"], 1), "done")
+    assert order == [("job", 0)]
+
+
+def test_render_errors_reach_every_waiter(hass):
+    release = threading.Event()
+    calls = []
+
+    def render(is_current):
+        calls.append(is_current)
+        release.wait(5)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        return ["file"], "ok"
+
+    scheduler = RenderScheduler(hass, render)
+
+    async def run():
+        waiters = [asyncio.ensure_future(scheduler.async_render())]
+        await asyncio.sleep(0.05)
+        waiters.append(asyncio.ensure_future(scheduler.async_render()))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        # The scheduler is usable again after a failed render.
+        return results, await scheduler.async_render()
+
+    results, after = asyncio.run(run())
+
+    assert all(isinstance(result, OSError) for result in results)
+    assert after == (["file"], "ok")
+
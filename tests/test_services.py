@@ -0,0 +1,78 @@
+"""Tests for the services of the integration."""
+import asyncio
+
+import pytest
+from stubs import HomeAssistantError
+
+from custom_components.frosted_glass_manager import const
+
+HAND_WRITTEN = "Xmas Red:\n  primary-color: red\n"
+BATCH = {
+    const.ATTR_THEMES: [
+        {const.ATTR_NAME: "Xmas Red", const.CONF_LIGHT_PRIMARY: [200, 30, 30]},
+    ]
+}
+
+
+async def _async_generate_batch(hass):
+    return await hass.services.async_call(
+        const.DOMAIN, const.SERVICE_GENERATE_BATCH, BATCH, blocking=True, return_response=True
+    )
+
+
+def test_generate_batch_writes_and_retakes_its_own_files(hass, setup_entry):
+    async def run():
+        await setup_entry()
+        return await _async_generate_batch(hass), await _async_generate_batch(hass)
+
+    first, second = asyncio.run(run())
+    assert first["files"] == ["Xmas Red.yaml", "Xmas Red Lite.yaml"]
+    assert second["changed"] == []
+    with open(hass.config.path("themes", "Xmas Red.yaml"), encoding="utf-8") as f:
+        assert f.readline() == const.GENERATED_HEADER
+
+
+def test_generate_batch_refuses_files_it_did_not_write(hass, setup_entry, tmp_path):
+    (tmp_path / "themes").mkdir()
+    foreign = tmp_path / "themes" / "Xmas Red.yaml"
+    foreign.write_text(HAND_WRITTEN, encoding="utf-8")
+
+    async def run():
+        await setup_entry()
+        await _async_generate_batch(hass)
+
+    with pytest.raises(HomeAssistantError, match="Xmas Red.yaml"):
+        asyncio.run(run())
+    assert foreign.read_text(encoding="utf-8") == HAND_WRITTEN
+    assert not (tmp_path / "themes" / "Xmas Red Lite.yaml").exists()
+
+
+def _analyze(hass, setup_entry, options):
+    async def run():
+        await setup_entry(options)
+        return await hass.services.async_call(
+            const.DOMAIN, const.SERVICE_ANALYZE_PAYLOAD, {}, blocking=True, return_response=True
+        )
+
+    return asyncio.run(run())
+
+
+def test_analyze_payload_reads_the_theme_files(hass, setup_entry):
+    result = _analyze(hass, setup_entry, {})
+
+    lite = f"{const.DEFAULT_THEME_NAME} Lite"
+    assert result["themes"][const.DEFAULT_THEME_NAME]["file"] == f"{const.DEFAULT_THEME_NAME}.yaml"
+    assert result["themes"][lite]["file"] == f"{lite}.yaml"
+    assert set(result["lite_vs_full"]) == {lite}
+
+
+def test_analyze_payload_reads_in_memory_themes_without_files(hass, setup_entry, tmp_path):
+    hass.data[const.FRONTEND_THEMES] = {}
+    options = {const.CONF_IN_MEMORY_THEMES: True, const.CONF_EXPORT_THEME_FILES: False}
+    result = _analyze(hass, setup_entry, options)
+
+    assert not (tmp_path / "themes").exists()
+    lite = f"{const.DEFAULT_THEME_NAME} Lite"
+    assert set(result["themes"]) == {const.DEFAULT_THEME_NAME, lite}
+    assert result["themes"][lite]["file"] is None
+    assert result["themes"][lite]["bytes"] > 0
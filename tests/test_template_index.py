@@ -0,0 +1,23 @@
+"""Tests for shifting the template index through edits."""
+from pathlib import Path
+
+import pytest
+
+from custom_components.frosted_glass_manager import renderer
+from custom_components.frosted_glass_manager.template_index import apply_edits, index_template
+
+TEMPLATES = Path(renderer.__file__).parent / "theme_templates"
+
+
+def _fields(index):
+    return index.name, index.modes, index.entries, index.blocks
+
+
+@pytest.mark.parametrize("filename", ["frosted_glass.yaml", "frosted_glass_lite.yaml"])
+def test_shifted_index_matches_a_fresh_parse(filename):
+    template = (TEMPLATES / filename).read_text(encoding="utf-8")
+    index = index_template(template)
+    for edits_of in (renderer._fallback_edits, renderer._minify_edits):
+        edits = edits_of(template, index)
+        template, index = apply_edits(template, index, edits)
+        assert _fields(index) == _fields(index_template(template))
@@ -0,0 +1,41 @@
+"""Tests that only theme files written by the integration are taken over."""
+import asyncio
+
+import custom_components.frosted_glass_manager as integration
+from custom_components.frosted_glass_manager import const
+
+HAND_WRITTEN = "Kitchen:\n  primary-color: red\n"
+
+
+def test_written_theme_files_carry_the_header(hass, setup_entry):
+    asyncio.run(setup_entry())
+
+    for filename in integration.theme_filenames(const.DEFAULT_THEME_NAME):
+        with open(hass.config.path("themes", filename), encoding="utf-8") as f:
+            assert f.readline() == const.GENERATED_HEADER
+        assert not integration.is_foreign_theme_file(hass, filename)
+
+
+def test_removing_an_entry_keeps_files_it_did_not_write(hass, setup_entry, tmp_path):
+    entry = asyncio.run(setup_entry(data={const.CONF_THEME_NAME: "Kitchen"}))
+    full, lite = integration.theme_filenames("Kitchen")
+    foreign = tmp_path / "themes" / full
+    foreign.write_text(HAND_WRITTEN, encoding="utf-8")
+
+    assert integration.is_foreign_theme_file(hass, full)
+    assert not integration.is_foreign_theme_file(hass, "Missing.yaml")
+    integration._remove_entry_files(hass, entry)
+
+    assert foreign.read_text(encoding="utf-8") == HAND_WRITTEN
+    assert not (tmp_path / "themes" / lite).exists()
+
+
+def test_themes_applied_directly_write_no_files_by_default(hass, setup_entry, tmp_path):
+    hass.data[const.FRONTEND_THEMES] = {}
+    asyncio.run(setup_entry({const.CONF_IN_MEMORY_THEMES: True}))
+
+    assert set(hass.data[const.FRONTEND_THEMES]) == set(
+        integration.theme_names(const.DEFAULT_THEME_NAME)
+    )
+    assert not (tmp_path / "themes").exists()
+    assert not (tmp_path / ".storage" / const.HISTORY_DIR).exists()
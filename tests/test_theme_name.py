@@ -0,0 +1,22 @@
+"""Tests that theme names load back as the same strings."""
+import pytest
+import yaml
+
+from custom_components.frosted_glass_manager import const, palette, renderer
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["Frosted Glass", "On", "off", "Null", "~", "2024", "1.5", "0x1F", "1_000", "Yes", "a: b", "#1"],
+)
+def test_theme_name_loads_as_itself(name):
+    primary = const.DEFAULT_LIGHT_RGB
+    values = renderer.render_values(
+        name,
+        {
+            mode: (primary, "/local/bg.jpg", palette.generate_hex_palette(primary))
+            for mode in (renderer.MODE_LIGHT, renderer.MODE_DARK)
+        },
+    )
+    compiled = renderer.get_compiled_template(const.THEME_TEMPLATE_FILE)
+    assert list(yaml.safe_load(compiled.render(values))) == [name]
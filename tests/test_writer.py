@@ -0,0 +1,67 @@
+"""Tests for the content-addressed theme file writer."""
+import os
+
+import pytest
+
+from custom_components.frosted_glass_manager import writer
+
+
+@pytest.fixture(autouse=True)
+def _clear_digests():
+    writer._DIGESTS.clear()
+    yield
+    writer._DIGESTS.clear()
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_segments_are_written_once_and_replaced_atomically(tmp_path):
+    path = str(tmp_path / "Theme.yaml")
+
+    assert writer.write_segments_if_changed(path, ["a: ", "1\n"])
+    assert not writer.write_segments_if_changed(path, ["a: 1", "\n"])
+    assert writer.known_digest(path) == writer.content_digest(b"a: 1\n")
+
+    inode = os.stat(path).st_ino
+    assert writer.write_segments_if_changed(path, ["a: 2\n"])
+    assert _read(path) == "a: 2\n"
+    # Replaced by rename, not rewritten in place, and no temporary file left
+    assert os.stat(path).st_ino != inode
+    assert os.listdir(tmp_path) == ["Theme.yaml"]
+
+
+def test_a_failed_replace_keeps_the_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "Theme.yaml")
+    writer.write_if_changed(path, "a: 1\n")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writer.os, "replace", fail)
+    with pytest.raises(OSError):
+        writer.write_if_changed(path, "a: 2\n")
+
+    assert _read(path) == "a: 1\n"
+    assert os.listdir(tmp_path) == ["Theme.yaml"]
+    assert writer.known_digest(path) == writer.content_digest(b"a: 1\n")
+
+
+def test_edits_on_disk_invalidate_the_cached_digest(tmp_path):
+    path = str(tmp_path / "Theme.yaml")
+    writer.write_if_changed(path, "a: 1\n")
+
+    # Same size, so only the new mtime tells the edit apart
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("a: 9\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert not writer.is_current(path, writer.content_digest(b"a: 1\n"))
+    assert writer.known_digest(path) == writer.content_digest(b"a: 9\n")
+    assert writer.write_if_changed(path, "a: 1\n")
+    assert _read(path) == "a: 1\n"
+
+    os.remove(path)
+    assert writer.write_if_changed(path, "a: 1\n")